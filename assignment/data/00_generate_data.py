@@ -0,0 +1,124 @@
+# RCDS Introduction to probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Final assignment:
+# Generate large synthetic datasets for the t, F, ANOVA and chi-square exercises.
+#
+# Usage:
+#   python 00_generate_data.py                      (example spec, small datasets)
+#   python 00_generate_data.py spec.json --out data --workers 8 --format npy
+#
+# A spec is a JSON list of datasets, for example:
+#   [{"name": "anova", "scenario": "anova", "n_rows": 100000000, "chunk_rows": 1000000,
+#     "seed": 1, "params": {"means": [5, 5, 5.2], "scale": 1}}]
+#
+# Every chunk of rows gets its own SeedSequence child, so the output is bit-identical for any number of workers.
+# npy output is one file per column (memory-mappable with np.load(..., mmap_mode = "r")),
+# parquet output is one part file per chunk.
+
+# Import libraries
+import argparse
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Example spec, mirroring the data of the exercises
+example_spec = [
+    {"name": "t_test", "scenario": "t_test", "n_rows": 1000000, "chunk_rows": 100000, "seed": 0,
+     "params": {"loc": [50, 55], "scale": [5, 5]}},
+    {"name": "f_test", "scenario": "f_test", "n_rows": 1000000, "chunk_rows": 100000, "seed": 42,
+     "params": {"loc": [50, 50], "scale": [5, 6]}},
+    {"name": "anova", "scenario": "anova", "n_rows": 1000000, "chunk_rows": 100000, "seed": 123,
+     "params": {"means": [5, 5, 5], "scale": 1}},
+    {"name": "chi_square", "scenario": "chi_square", "n_rows": 1000000, "chunk_rows": 100000, "seed": 123,
+     "params": {"frequencies": [1, 1, 2, 1, 2, 1, 2, 1, 2, 1]}},
+]
+
+# Column names and dtypes of every scenario
+columns = {
+    "t_test": {"value": np.float64, "group": np.int32},
+    "f_test": {"value": np.float64, "group": np.int32},
+    "anova": {"value": np.float64, "group": np.int32},
+    "chi_square": {"choice": np.int32},
+}
+
+# Gaussian observations for k groups with their own location and scale, group labels drawn uniformly
+def _grouped_normal(rng, n, loc, scale):
+    loc, scale = np.asarray(loc, dtype = float), np.broadcast_to(np.asarray(scale, dtype = float), np.shape(loc))
+    group = rng.integers(0, loc.size, size = n).astype(np.int32)
+    value = loc[group] + scale[group] * rng.standard_normal(n)
+    return {"value": value, "group": group}
+
+# Rows of one chunk for a scenario
+def generate_chunk(scenario, params, rng, n):
+    if scenario in ("t_test", "f_test"):
+        return _grouped_normal(rng, n, params["loc"], params["scale"])
+    if scenario == "anova":
+        return _grouped_normal(rng, n, params["means"], params.get("scale", 1.0))
+    if scenario == "chi_square":
+        frequencies = np.asarray(params["frequencies"], dtype = float)
+        return {"choice": rng.choice(frequencies.size, size = n, p = frequencies / frequencies.sum()).astype(np.int32)}
+    raise ValueError(f"unknown scenario: {scenario}")
+
+# Generate one chunk and write it to its slice of the column files (npy) or to its own part file (parquet)
+def _write_chunk(args):
+    dataset, directory, fmt, index, seed, start, stop = args
+    data = generate_chunk(dataset["scenario"], dataset.get("params", {}), np.random.default_rng(seed), stop - start)
+    if fmt == "npy":
+        for name, values in data.items():
+            column = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode = "r+")
+            column[start:stop] = values
+            column.flush()
+            del column
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(data), os.path.join(directory, f"part-{index:05d}.parquet"))
+    return stop - start
+
+# Generate every dataset of a spec under out_dir, spreading chunks across n_workers processes
+def generate(spec, out_dir, n_workers = 1, fmt = "npy"):
+    if fmt not in ("npy", "parquet"):
+        raise ValueError("format must be 'npy' or 'parquet'")
+    tasks = []
+    for dataset in spec:
+        if dataset["scenario"] not in columns:
+            raise ValueError(f"unknown scenario: {dataset['scenario']}")
+        directory = os.path.join(out_dir, dataset["name"])
+        os.makedirs(directory, exist_ok = True)
+        n_rows, chunk_rows = int(dataset["n_rows"]), int(dataset.get("chunk_rows", 1000000))
+        starts = range(0, n_rows, chunk_rows)
+        seeds = np.random.SeedSequence(dataset.get("seed")).spawn(len(starts))
+
+        # Preallocate the column files, so workers can fill their own rows
+        if fmt == "npy":
+            for name, dtype in columns[dataset["scenario"]].items():
+                np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode = "w+", dtype = dtype, shape = (n_rows, ))
+        with open(os.path.join(directory, "spec.json"), "w") as file:
+            json.dump(dataset, file, indent = 2)
+        tasks += [(dataset, directory, fmt, i, seed, start, min(start + chunk_rows, n_rows))
+                  for i, (seed, start) in enumerate(zip(seeds, starts))]
+
+    if n_workers == 1:
+        return sum(map(_write_chunk, tasks))
+    with ProcessPoolExecutor(max_workers = n_workers) as executor:
+        return sum(executor.map(_write_chunk, tasks))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "Generate synthetic datasets for the hypothesis testing exercises.")
+    parser.add_argument("spec", nargs = "?", help = "JSON spec file (default: built-in example spec)")
+    parser.add_argument("--out", default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated"),
+                        help = "output directory")
+    parser.add_argument("--workers", type = int, default = 1, help = "number of worker processes")
+    parser.add_argument("--format", choices = ["npy", "parquet"], default = "npy", help = "output format")
+    args = parser.parse_args()
+
+    if args.spec is None:
+        spec = example_spec
+    else:
+        with open(args.spec) as file:
+            spec = json.load(file)
+    n_rows = generate(spec, args.out, args.workers, args.format)
+    print(f"Generated {n_rows} rows in {len(spec)} datasets under {args.out}")
@@ -0,0 +1,127 @@
+# RCDS Introduction to probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Final assignment:
+# Simulate discrete Markov chains, and compute their stationary distribution and hitting times.
+
+# Import libraries
+import numpy as np
+from scipy.sparse import csr_matrix, identity
+from scipy.sparse.linalg import eigs, spsolve
+
+# Transition matrix as CSR, checking that every row is a probability distribution
+def transition_matrix(P):
+    P = csr_matrix(P, dtype = float)
+    if P.shape[0] != P.shape[1]:
+        raise ValueError("the transition matrix must be square")
+    if P.data.size and P.data.min() < 0:
+        raise ValueError("transition probabilities must be non-negative")
+    if not np.allclose(np.asarray(P.sum(axis = 1)).ravel(), 1.0):
+        raise ValueError("every row of the transition matrix must sum to 1")
+    P.sort_indices()
+    return P
+
+# Cumulative transition rows stored as one running sum over the CSR data
+# (the row of state s is the slice indptr[s]:indptr[s + 1], its cumulative values start after base[s])
+def _cumulative_rows(P):
+    cumulative = np.cumsum(P.data)
+    base = np.concatenate([[0.0], cumulative])[P.indptr[:-1]]
+    return cumulative, base
+
+# Simulate many walkers in parallel, each step samples the next state of every walker at once
+# with a binary search confined to each walker's own row (log2 of the largest row length iterations,
+# each one a vectorized operation over all walkers, no loop over walkers or states)
+# Returns the final states, or the (n_steps + 1, walkers) path matrix if record_path is True
+def simulate_chains(P, initial_states, n_steps, record_path = False, seed = None):
+    P = transition_matrix(P)
+    rng = np.random.default_rng(seed)
+    cumulative, base = _cumulative_rows(P)
+    row_start, row_end = P.indptr[:-1], P.indptr[1:] - 1
+    row_total = cumulative[np.maximum(row_end, 0)] - base
+    n_halvings = int(np.ceil(np.log2(max(np.diff(P.indptr).max(), 1)))) + 1
+    states = np.array(initial_states, dtype = np.int64)
+    path = np.empty((n_steps + 1, states.size), dtype = np.int64) if record_path else None
+    if record_path:
+        path[0] = states
+
+    for step in range(1, n_steps + 1):
+        target = base[states] + rng.random(states.size) * row_total[states]
+        low, high = row_start[states], row_end[states]
+        for halving in range(n_halvings):
+            middle = (low + high) // 2
+            right = cumulative[middle] <= target
+            low = np.where(right, middle + 1, low)
+            high = np.where(right, high, middle)
+        states = P.indices[np.minimum(low, row_end[states])]
+        if record_path:
+            path[step] = states
+    return path if record_path else states
+
+# Stationary distribution pi = pi P, by power iteration or by the sparse eigensolver (eigenvalue 1 of P^T)
+def stationary_distribution(P, method = "power", tol = 1e-12, max_iter = 100000):
+    P = transition_matrix(P)
+    n = P.shape[0]
+    PT = P.T.tocsr()
+    if method == "power":
+        pi = np.full(n, 1 / n)
+        for iteration in range(max_iter):
+            new = PT @ pi
+            new /= new.sum()
+            if np.abs(new - pi).sum() < tol:
+                return new
+            pi = new
+        raise RuntimeError("power iteration did not converge, the chain may be periodic")
+    if method == "eigs":
+        # Shift-invert around 1 targets eigenvalue 1 itself: periodic chains have other eigenvalues of modulus 1,
+        # that the largest-modulus search could return (the shift is nudged off 1 because P^T - I is singular)
+        # ARPACK needs at least 3 states, tiny chains use the dense solver
+        values, vectors = np.linalg.eig(PT.toarray()) if n < 3 else eigs(PT, k = 1, sigma = 1 + 1e-10)
+        closest = np.argmin(np.abs(values - 1))
+        if abs(values[closest] - 1) > 1e-8:
+            raise RuntimeError("no eigenvalue 1 found, P is not a transition matrix")
+        pi = np.real(vectors[:, closest])
+        return pi / pi.sum()
+    raise ValueError("method must be 'power' or 'eigs'")
+
+# Expected number of steps to reach any of the target states, from every state
+# Solves (I - Q) h = 1 on the non-target states with a sparse solver (h = 0 on the targets)
+def hitting_times(P, targets):
+    P = transition_matrix(P)
+    n = P.shape[0]
+    is_target = np.zeros(n, dtype = bool)
+    is_target[np.asarray(targets)] = True
+    others = np.flatnonzero(~is_target)
+    Q = P[others][:, others]
+    h = np.zeros(n)
+    h[others] = spsolve((identity(others.size, format = "csr") - Q).tocsc(), np.ones(others.size))
+    return h
+
+
+if __name__ == "__main__":
+
+    # User journeys: 0 = home, 1 = product, 2 = cart, 3 = checkout
+    states = ["home", "product", "cart", "checkout"]
+    P = np.array([[0.2, 0.6, 0.1, 0.1],
+                  [0.3, 0.3, 0.3, 0.1],
+                  [0.1, 0.2, 0.3, 0.4],
+                  [0.7, 0.1, 0.1, 0.1]])
+
+    # Simulate one million walkers starting at home
+    final = simulate_chains(P, np.zeros(10 ** 6, dtype = np.int64), n_steps = 20, seed = 42)
+    print("\nFraction of walkers per state after 20 steps:", np.bincount(final, minlength = 4) / final.size)
+    print("Stationary distribution (power):", stationary_distribution(P).round(4))
+    print("Stationary distribution (eigs): ", stationary_distribution(P, method = "eigs").round(4))
+    for state, steps in zip(states, hitting_times(P, [3])):
+        print(f"Expected steps from {state} to checkout: {steps:.2f}")
+
+    # Large sparse chain: 100000 states with 10 random transitions each
+    rng = np.random.default_rng(0)
+    n_states, degree = 100000, 10
+    rows = np.repeat(np.arange(n_states), degree)
+    cols = rng.integers(0, n_states, size = n_states * degree)
+    weights = rng.random(n_states * degree)
+    P_large = csr_matrix((weights, (rows, cols)), shape = (n_states, n_states))
+    P_large = csr_matrix(P_large.multiply(1 / P_large.sum(axis = 1)))
+    final = simulate_chains(P_large, rng.integers(0, n_states, size = 10 ** 6), n_steps = 20, seed = 1)
+    pi = stationary_distribution(P_large, tol = 1e-10)
+    print(f"\nLarge chain: {n_states} states, 10^6 walkers, most visited state after 20 steps = {np.bincount(final).argmax()}, "
+          f"stationary probability of the most likely state = {pi.max():.2e}")
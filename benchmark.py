@@ -0,0 +1,319 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Benchmark of the manual and library (SciPy) computations of the exercises in chapters 1-3.
+#
+# Usage:
+#   python benchmark.py                                   (n = 10^2 .. 10^6, batch = 1 .. 10^5, up to 10^7 values)
+#   python benchmark.py --max-n 8 --max-elements 100000000 --out results.json
+#   python benchmark.py --cases t_test_1_sample f_anova --compare old_results.json
+#
+# Every case computes one test on a (batch, n) array of simulated data, i.e. batch independent datasets
+# of n observations each. The manual path is the formula of the exercise script, applied row by row
+# along axis 1 (or looping over rows where the exercise uses a scalar routine such as quad), and the
+# library path is the SciPy function used in the same script.
+# For every (case, n, batch) the benchmark records the best wall time over --repeat runs, the peak
+# memory allocated during one run (tracemalloc, which also traces numpy arrays) and the agreement
+# between both paths. Combinations above --max-elements values are recorded as skipped.
+# The matching .R scripts are timed end to end when Rscript is installed.
+
+# Import libraries
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import scipy
+from scipy.integrate import quad
+from scipy.stats import (bartlett, chi2, chisquare, f, f_oneway, false_discovery_control, levene, norm, t,
+                         ttest_1samp, ttest_ind)
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Cases .............................................................................................
+
+# Chapter 1. One sample t-test (coin tosses against a fair coin)
+def t1_data(rng, n, batch):
+    return rng.binomial(1, 0.55, size = (batch, n)).astype(float)
+
+def t1_manual(observations):
+    n = observations.shape[1]
+    mean_observed = np.mean(observations, axis = 1)
+    std_dev_observed = np.std(observations, ddof = 1, axis = 1)
+    t_stat = (mean_observed - 0.5) / (std_dev_observed / np.sqrt(n))
+    return t_stat, 2 * (1 - t.cdf(np.abs(t_stat), df = n - 1))
+
+def t1_library(observations):
+    return ttest_1samp(observations, popmean = 0.5, axis = 1)
+
+# Chapter 1. Two sample t-test (two groups of equal size)
+def t2_data(rng, n, batch):
+    return rng.normal(50, 5, size = (batch, n)), rng.normal(50.5, 5, size = (batch, n))
+
+def t2_manual(data):
+    sample1, sample2 = data
+    n1, n2 = sample1.shape[1], sample2.shape[1]
+    std1, std2 = np.std(sample1, ddof = 1, axis = 1), np.std(sample2, ddof = 1, axis = 1)
+    se = np.sqrt((std1 ** 2 / n1) + (std2 ** 2 / n2))
+    t_stat = (np.mean(sample1, axis = 1) - np.mean(sample2, axis = 1)) / se
+    return t_stat, 2 * (1 - t.cdf(np.abs(t_stat), df = n1 + n2 - 2))
+
+def t2_library(data):
+    return ttest_ind(data[0], data[1], axis = 1)
+
+# Chapter 2. F test for equal variances, compared with Bartlett's and Levene's tests (different statistics)
+def f_data(rng, n, batch):
+    return rng.normal(50, 5, size = (batch, n)), rng.normal(50, 5.5, size = (batch, n))
+
+def f_manual(data):
+    sample1, sample2 = data
+    var1, var2 = np.var(sample1, ddof = 1, axis = 1), np.var(sample2, ddof = 1, axis = 1)
+    F_stat = np.maximum(var1, var2) / np.minimum(var1, var2)
+    return F_stat, np.minimum(1.0, 2 * (1 - f.cdf(F_stat, sample1.shape[1] - 1, sample2.shape[1] - 1)))
+
+def bartlett_library(data):
+    results = [bartlett(sample1, sample2) for sample1, sample2 in zip(*data)]
+    return np.array([r[0] for r in results]), np.array([r[1] for r in results])
+
+def levene_library(data):
+    results = [levene(sample1, sample2, center = "mean") for sample1, sample2 in zip(*data)]
+    return np.array([r[0] for r in results]), np.array([r[1] for r in results])
+
+# Chapter 2. One-way ANOVA with three groups
+def anova_data(rng, n, batch):
+    return [rng.normal(mean, 1, size = (batch, n)) for mean in (5, 5, 5.1)]
+
+def anova_manual(groups):
+    means = [np.mean(group, axis = 1) for group in groups]
+    overall_mean = np.mean(np.concatenate(groups, axis = 1), axis = 1)
+    df_between = len(groups) - 1
+    df_within = sum(group.shape[1] for group in groups) - len(groups)
+    ssb = sum(group.shape[1] * (mean - overall_mean) ** 2 for group, mean in zip(groups, means)) / df_between
+    ssw = sum(np.sum((group - mean[:, None]) ** 2, axis = 1) for group, mean in zip(groups, means)) / df_within
+    F_stat = ssb / ssw
+    return F_stat, 1 - f.cdf(F_stat, df_between, df_within)
+
+def anova_library(groups):
+    return f_oneway(*groups, axis = 1)
+
+# Chapter 3. Chi-square test of the numbers chosen by people (counts of 10 categories, uniform expectation)
+def choices_data(rng, n, batch):
+    frequencies = np.array([1, 1, 2, 1, 2, 1, 2, 1, 2, 1], dtype = float)
+    observed = rng.multinomial(n, frequencies / frequencies.sum(), size = batch)
+    return observed, np.full(observed.shape, n / 10)
+
+def chi2_manual(data):
+    observed, expected = data
+    chi_square = np.sum((observed - expected) ** 2 / expected, axis = 1)
+    return chi_square, 1 - chi2.cdf(chi_square, observed.shape[1] - 1)
+
+def chi2_library(data):
+    return chisquare(data[0], f_exp = data[1], axis = 1)
+
+# Chapter 3. Chi-square test for normality, binned data against the fitted gaussian, p-value integrated with quad
+def normality_data(rng, n, batch, num_bins = 10):
+    observed_data = rng.normal(0, 1, size = (batch, n))
+    low, high = observed_data.min(axis = 1), observed_data.max(axis = 1)
+    bins = np.clip(((observed_data - low[:, None]) / (high - low)[:, None] * num_bins).astype(np.int64), 0, num_bins - 1)
+    hist = np.bincount((bins + num_bins * np.arange(batch)[:, None]).ravel(), minlength = batch * num_bins)
+    hist = hist.reshape(batch, num_bins)
+    bin_edges = low[:, None] + (high - low)[:, None] * np.linspace(0, 1, num_bins + 1)
+    cdf_values = norm.cdf(bin_edges, loc = observed_data.mean(axis = 1)[:, None], scale = observed_data.std(axis = 1)[:, None])
+    expected_frequencies = np.diff(cdf_values, axis = 1)
+    expected_frequencies *= hist.sum(axis = 1, keepdims = True) / expected_frequencies.sum(axis = 1, keepdims = True)
+    return hist, expected_frequencies
+
+def normality_manual(data):
+    hist, expected_frequencies = data
+    chi_square = np.sum((hist - expected_frequencies) ** 2 / expected_frequencies, axis = 1)
+    df = hist.shape[1] - 1
+    p_values = np.array([quad(chi2.pdf, statistic, np.inf, args = (df, ))[0] for statistic in chi_square])
+    return chi_square, p_values
+
+# Chapter 3. Benjamini-Hochberg adjusted p-values of families of n p-values
+def bh_data(rng, n, batch):
+    p_values = rng.random((batch, n))
+    p_values[:, :max(1, n // 10)] *= 1e-3
+    return p_values
+
+def bh_manual(p_values):
+    n = p_values.shape[1]
+    sorted_indices = np.argsort(p_values, axis = 1)
+    sorted_pvals = np.take_along_axis(p_values, sorted_indices, axis = 1)
+    bh_pvals = sorted_pvals * n / np.arange(1, n + 1)
+    bh_pvals = np.minimum.accumulate(bh_pvals[:, ::-1], axis = 1)[:, ::-1]
+    bh_corrected_pvals = np.empty_like(p_values)
+    np.put_along_axis(bh_corrected_pvals, sorted_indices, np.minimum(bh_pvals, 1.0), axis = 1)
+    return bh_corrected_pvals, bh_corrected_pvals
+
+def bh_library(p_values):
+    adjusted = false_discovery_control(p_values, axis = 1)
+    return adjusted, adjusted
+
+# Every case: chapter, exercise script, data generator, both paths, whether both compute the same statistic,
+# number of values held by the data, and the largest batch for paths that loop over rows in Python
+cases = {
+    "t_test_1_sample": {"script": "chapter1/exercises/t_test_1_sample", "data": t1_data, "manual": t1_manual,
+                        "library": t1_library, "same_statistic": True, "elements": lambda n, batch: n * batch},
+    "t_test_2_samples": {"script": "chapter1/exercises/t_test_2_samples", "data": t2_data, "manual": t2_manual,
+                         "library": t2_library, "same_statistic": True, "elements": lambda n, batch: 2 * n * batch},
+    "f_test_bartlett": {"script": "chapter2/exercises/f_test", "data": f_data, "manual": f_manual,
+                        "library": bartlett_library, "same_statistic": False, "elements": lambda n, batch: 2 * n * batch,
+                        "loop": "library"},
+    "f_test_levene": {"script": "chapter2/exercises/f_test", "data": f_data, "manual": f_manual,
+                      "library": levene_library, "same_statistic": False, "elements": lambda n, batch: 2 * n * batch,
+                      "loop": "library"},
+    "f_anova": {"script": "chapter2/exercises/f_anova", "data": anova_data, "manual": anova_manual,
+                "library": anova_library, "same_statistic": True, "elements": lambda n, batch: 3 * n * batch},
+    "random_numbers_chi2": {"script": "chapter3/exercises/random_numbers_chi2", "data": choices_data,
+                            "manual": chi2_manual, "library": chi2_library, "same_statistic": True,
+                            "elements": lambda n, batch: 10 * batch},
+    "check_normality": {"script": "chapter3/exercises/check_normality", "data": normality_data,
+                        "manual": normality_manual, "library": chi2_library, "same_statistic": True,
+                        "elements": lambda n, batch: n * batch, "loop": "manual"},
+    "adjusted_pvalues": {"script": "chapter3/exercises/adjusted_pvalues", "data": bh_data, "manual": bh_manual,
+                         "library": bh_library, "same_statistic": True, "elements": lambda n, batch: n * batch},
+}
+
+# Measurements ......................................................................................
+
+# Best wall time over repeats, then peak traced memory (in bytes) of one more run
+def measure(function, data, repeat):
+    times = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = function(data)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, min(times), peak
+
+# Largest absolute differences of statistics and p-values, and the fraction of equal decisions at alpha
+def agreement(manual, library, same_statistic, alpha = 0.05):
+    manual_stat, manual_p = (np.asarray(x, dtype = float) for x in manual)
+    library_stat, library_p = (np.asarray(x, dtype = float) for x in library)
+    return {"statistic": float(np.max(np.abs(manual_stat - library_stat))) if same_statistic else None,
+            "p_value": float(np.max(np.abs(manual_p - library_p))) if same_statistic else None,
+            "decision": float(np.mean((manual_p < alpha) == (library_p < alpha)))}
+
+# Run one case for every n and batch size
+def run_case(name, sizes, batches, max_elements, max_loop, repeat, seed):
+    case = cases[name]
+    records = []
+    for n in sizes:
+        for batch in batches:
+            record = {"case": name, "script": case["script"] + ".py", "n": n, "batch": batch}
+            elements = case["elements"](n, batch)
+            if elements > max_elements:
+                records.append({**record, "status": "skipped", "reason": f"{elements} values > max_elements"})
+                continue
+            data = case["data"](np.random.default_rng(seed), n, batch)
+            for path in ("manual", "library"):
+                if case.get("loop") == path and batch > max_loop:
+                    record[path] = {"status": "skipped", "reason": f"Python loop over {batch} rows > max_loop"}
+                    continue
+                result, seconds, peak = measure(case[path], data, repeat)
+                record[path] = {"status": "ok", "seconds": seconds, "peak_bytes": peak, "result": result}
+            if record["manual"]["status"] == record["library"]["status"] == "ok":
+                record["agreement"] = agreement(record["manual"]["result"], record["library"]["result"], case["same_statistic"])
+            for path in ("manual", "library"):
+                record[path].pop("result", None)
+            record["status"] = "ok"
+            records.append(record)
+            del data
+            print(f"{name:>20}  n = {n:<10} batch = {batch:<7}" + "".join(
+                f"  {path} = {record[path]['seconds']:.3e} s" if record[path]["status"] == "ok" else f"  {path} = skipped"
+                for path in ("manual", "library")), file = sys.stderr)
+    return records
+
+# Time the .R scripts of the benchmarked exercises end to end (plots go to a temporary directory)
+def run_r_scripts(names, timeout):
+    rscript = shutil.which("Rscript")
+    scripts = sorted({cases[name]["script"] + ".R" for name in names})
+    if rscript is None:
+        return [{"script": script, "status": "skipped", "reason": "Rscript not found"} for script in scripts]
+    records = []
+    for script in scripts:
+        path = os.path.join(here, script)
+        if not os.path.exists(path):
+            records.append({"script": script, "status": "skipped", "reason": "no R script"})
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            try:
+                process = subprocess.run([rscript, path], cwd = directory, capture_output = True, timeout = timeout)
+                status = "ok" if process.returncode == 0 else f"exit code {process.returncode}"
+            except subprocess.TimeoutExpired:
+                status = "timeout"
+            records.append({"script": script, "status": status, "seconds": time.perf_counter() - start})
+    return records
+
+# Versions and machine, so results of different runs can be compared
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd = here, capture_output = True, text = True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"date": datetime.now(timezone.utc).isoformat(), "commit": commit or None, "python": platform.python_version(),
+            "numpy": np.__version__, "scipy": scipy.__version__, "platform": platform.platform(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count()}
+
+# Print the (case, n, batch, path) timings that got slower than threshold times a previous results file
+def compare(results, previous, threshold):
+    old = {(r["case"], r["n"], r["batch"]): r for r in previous["results"] if r["status"] == "ok"}
+    slower = 0
+    for record in results["results"]:
+        key = (record["case"], record["n"], record["batch"])
+        if record["status"] != "ok" or key not in old:
+            continue
+        for path in ("manual", "library"):
+            new_path, old_path = record[path], old[key][path]
+            if new_path["status"] == old_path["status"] == "ok" and new_path["seconds"] > threshold * old_path["seconds"]:
+                slower += 1
+                print(f"Slower: {key[0]} n = {key[1]} batch = {key[2]} {path}: "
+                      f"{old_path['seconds']:.3e} s -> {new_path['seconds']:.3e} s")
+    print(f"{slower} timings slower than {threshold} x the previous results ({previous['environment'].get('commit')})")
+    return slower
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "Benchmark manual against SciPy computations of chapters 1-3.")
+    parser.add_argument("--cases", nargs = "+", choices = list(cases), default = list(cases))
+    parser.add_argument("--min-n", type = int, default = 2, help = "smallest sample size, as a power of 10")
+    parser.add_argument("--max-n", type = int, default = 6, help = "largest sample size, as a power of 10 (up to 8)")
+    parser.add_argument("--max-batch", type = int, default = 5, help = "largest batch size, as a power of 10")
+    parser.add_argument("--max-elements", type = int, default = 10 ** 7, help = "skip datasets holding more values")
+    parser.add_argument("--max-loop", type = int, default = 10 ** 3, help = "skip Python loops over more rows")
+    parser.add_argument("--repeat", type = int, default = 3, help = "timed runs per measurement (best is kept)")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--out", default = "benchmark_results.json", help = "JSON results file")
+    parser.add_argument("--compare", metavar = "JSON", help = "previous results file to check for regressions")
+    parser.add_argument("--threshold", type = float, default = 1.5, help = "slowdown reported by --compare")
+    parser.add_argument("--r-timeout", type = float, default = 600, help = "seconds allowed for each R script")
+    args = parser.parse_args()
+
+    sizes = [10 ** k for k in range(args.min_n, args.max_n + 1)]
+    batches = [10 ** k for k in range(args.max_batch + 1)]
+    results = {"environment": environment(),
+               "settings": {"sizes": sizes, "batches": batches, "max_elements": args.max_elements,
+                            "max_loop": args.max_loop, "repeat": args.repeat, "seed": args.seed},
+               "results": [record for name in args.cases
+                           for record in run_case(name, sizes, batches, args.max_elements, args.max_loop, args.repeat, args.seed)],
+               "r_scripts": run_r_scripts(args.cases, args.r_timeout)}
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent = 2)
+    print(f"Saved {len(results['results'])} measurements to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file), args.threshold)
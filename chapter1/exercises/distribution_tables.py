@@ -0,0 +1,241 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import os
+from collections import OrderedDict
+import numpy as np
+from scipy.stats import chi2, f, norm, t
+
+# Distributions with their degrees of freedom (None for the normal, df2 only for F)
+def distribution(name, df1 = None, df2 = None):
+    if name == "t":
+        return t(df1)
+    if name == "f":
+        return f(df1, df2)
+    if name == "chi2":
+        return chi2(df1)
+    if name == "norm":
+        return norm()
+    raise ValueError("distribution must be 't', 'f', 'chi2' or 'norm'")
+
+# Tables are uniform grids in u = log(x) for the F and chi-square, and u = asinh(x) for the t and normal,
+# where the survival function is smooth (down to x = 0, and in the heavy tails of the t with few degrees
+# of freedom), so the interval of a statistic is found in O(1)
+def to_grid(name, x):
+    if name in ("f", "chi2"):
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            return np.log(x)
+    return np.arcsinh(x)
+
+# Survival function and its slope d sf / du at grid points u
+def sf_and_slope(dist, name, u):
+    if name in ("f", "chi2"):
+        x = np.exp(u)
+        return dist.sf(x), -dist.pdf(x) * x
+    x = np.sinh(u)
+    return dist.sf(x), -dist.pdf(x) * np.cosh(u)
+
+# Coefficients of the cubic Hermite polynomial a + b s + c s^2 + d s^3 on every interval (s from 0 to 1)
+def hermite_coefficients(sf, slope, h):
+    m0, m1 = slope[:-1] * h, slope[1:] * h
+    return sf[:-1], m0, 3 * (sf[1:] - sf[:-1]) - 2 * m0 - m1, 2 * (sf[:-1] - sf[1:]) + m0 + m1
+
+# Evaluate the table at grid points u, together with the mask of points outside the table (or NaN)
+def evaluate_table(u, u0, h, coefficients):
+    a, b, c, d = coefficients
+    position = (u - u0) / h
+    outside = ~((position >= 0) & (position <= a.size))
+    i = np.fmin(np.fmax(position, 0), a.size - 1).astype(np.intp)
+    s = np.fmin(np.fmax(position, 0), a.size) - i
+    return ((d[i] * s + c[i]) * s + b[i]) * s + a[i], outside
+
+# Dense table of the survival function between the tail and 1 - tail quantiles
+# The grid is refined by halving every interval until the error at all midpoints is below tol
+# (the error of cubic Hermite interpolation is largest at the middle of each interval)
+def build_table(dist, name, tol = 1e-10, tail = 1e-4, n_start = 64, max_rounds = 16):
+    u0, u1 = to_grid(name, dist.ppf(tail)), to_grid(name, dist.isf(tail))
+    u = np.linspace(u0, u1, n_start + 1)
+    sf, slope = sf_and_slope(dist, name, u)
+    for round in range(max_rounds):
+        h = u[1] - u[0]
+        middle = u[:-1] + h / 2
+        middle_sf, middle_slope = sf_and_slope(dist, name, middle)
+        interpolated, outside = evaluate_table(middle, u0, h, hermite_coefficients(sf, slope, h))
+        if np.max(np.abs(interpolated - middle_sf)) <= tol:
+            return u0, h, sf, slope
+        u = np.append(np.column_stack([u[:-1], middle]).ravel(), u[-1])
+        sf = np.append(np.column_stack([sf[:-1], middle_sf]).ravel(), sf[-1])
+        slope = np.append(np.column_stack([slope[:-1], middle_slope]).ravel(), slope[-1])
+    raise RuntimeError("the table did not reach the requested tolerance")
+
+# Cache of survival-function tables and critical values for the t, F, chi-square and normal distributions
+# Inside the table range, p-values are interpolated with an absolute error below tol, statistics in the
+# extreme tails (p-value below tail on either side) are computed exactly, so small p-values keep full precision
+# Tables are built lazily, only for degrees of freedom shared by at least min_count statistics, the least
+# recently used ones are evicted beyond max_tables, and they are stored in directory (if given) for later processes
+class DistributionTables:
+
+    def __init__(self, tol = 1e-10, tail = 1e-4, max_tables = 64, min_count = 1000, directory = None):
+        self.tol = tol
+        self.tail = tail
+        self.max_tables = max_tables
+        self.min_count = min_count
+        self.directory = directory
+        self.tables = OrderedDict()
+        self.critical_values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        name, df1, df2 = key
+        return os.path.join(self.directory, f"{name}_{df1}_{df2}_{self.tol:g}_{self.tail:g}.npz")
+
+    # Table of one distribution (grid start, grid step, Hermite coefficients), from memory, from disk,
+    # or built and stored
+    def table(self, name, df1 = None, df2 = None):
+        key = (name, df1, df2)
+        if key in self.tables:
+            self.hits += 1
+            self.tables.move_to_end(key)
+            return self.tables[key]
+        self.misses += 1
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                u0, h, sf, slope = float(stored["u0"]), float(stored["h"]), stored["sf"], stored["slope"]
+        else:
+            # Built to tol / 2, so doubled (two-sided) p-values are still within tol
+            u0, h, sf, slope = build_table(distribution(name, df1, df2), name, self.tol / 2, self.tail)
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok = True)
+                np.savez(self._path(key), u0 = u0, h = h, sf = sf, slope = slope)
+        self.tables[key] = (u0, h, hermite_coefficients(sf, slope, h))
+        if len(self.tables) > self.max_tables:
+            self.tables.popitem(last = False)
+        return self.tables[key]
+
+    # Upper (sf) or lower (cdf) tail probability of statistics x sharing the same degrees of freedom
+    def _tail(self, name, x, df1, df2, lower, use_table):
+        dist = distribution(name, df1, df2)
+        if not use_table:
+            return dist.cdf(x) if lower else dist.sf(x)
+        u0, h, coefficients = self.table(name, df1, df2)
+        result, outside = evaluate_table(to_grid(name, x), u0, h, coefficients)
+        if lower:
+            result = 1 - result
+        if outside.any():
+            result[outside] = dist.cdf(x[outside]) if lower else dist.sf(x[outside])
+        return result
+
+    # Tail probabilities of an array of statistics, df1 and df2 (scalars or arrays broadcast against x)
+    # Statistics are grouped by their degrees of freedom, non-finite degrees of freedom give NaN
+    def _tails(self, name, x, df1, df2, lower):
+        x = np.asarray(x, dtype = float)
+        if np.ndim(df1) == 0 and np.ndim(df2) == 0:
+            if (df1 is not None and not np.isfinite(df1)) or (df2 is not None and not np.isfinite(df2)):
+                return np.full(x.shape, np.nan)
+            df1, df2 = (None if v is None else int(v) if v == int(v) else float(v) for v in (df1, df2))
+            return self._tail(name, x.ravel(), df1, df2, lower, x.size >= self.min_count).reshape(x.shape)
+        shape = x.shape
+        df1 = np.broadcast_to(np.asarray(np.nan if df1 is None else df1, dtype = float), shape).ravel()
+        df2 = np.broadcast_to(np.asarray(np.nan if df2 is None else df2, dtype = float), shape).ravel()
+        valid = (np.isfinite(df1) | (name == "norm")) & (np.isfinite(df2) | (name != "f"))
+        codes1, df1_values = np.unique(np.where(valid, df1, 0), return_inverse = True)[::-1]
+        codes2, df2_values = np.unique(np.where(valid, df2, 0), return_inverse = True)[::-1]
+        groups = codes1.ravel() * df2_values.size + codes2.ravel()
+        order = np.argsort(np.where(valid, groups, -1), kind = "stable")
+        x, groups = x.ravel(), groups[order]
+        result = np.full(x.size, np.nan)
+        starts = np.flatnonzero(np.diff(groups, prepend = -2)) if x.size else np.empty(0, dtype = np.intp)
+        for start, stop in zip(starts, np.append(starts[1:], x.size)):
+            members = order[start:stop]
+            if not valid[members[0]]:
+                continue
+            a = df1_values[groups[start] // df2_values.size] if name != "norm" else None
+            b = df2_values[groups[start] % df2_values.size] if name == "f" else None
+            a, b = (None if v is None else int(v) if v == int(v) else float(v) for v in (a, b))
+            result[members] = self._tail(name, x[members], a, b, lower, members.size >= self.min_count)
+        return result.reshape(shape)
+
+    # Survival function P(X > x)
+    def sf(self, name, x, df1 = None, df2 = None):
+        return self._tails(name, x, df1, df2, lower = False)
+
+    # Cumulative distribution function P(X <= x)
+    def cdf(self, name, x, df1 = None, df2 = None):
+        return self._tails(name, x, df1, df2, lower = True)
+
+    # P-value for the chosen alternative hypothesis
+    # The two-sided p-value doubles the smaller tail, which for the symmetric t and normal is 2 sf(|x|)
+    def p_value(self, name, x, df1 = None, df2 = None, alternative = "two-sided"):
+        x = np.asarray(x, dtype = float)
+        if alternative == "greater":
+            return self.sf(name, x, df1, df2)
+        if alternative == "less":
+            if name in ("t", "norm"):
+                return self.sf(name, -x, df1, df2)
+            return self.cdf(name, x, df1, df2)
+        if alternative != "two-sided":
+            raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+        if name in ("t", "norm"):
+            return np.minimum(1.0, 2 * self.sf(name, np.abs(x), df1, df2))
+        return np.minimum(1.0, 2 * np.minimum(self.sf(name, x, df1, df2), self.cdf(name, x, df1, df2)))
+
+    # Critical value for significance level alpha (upper tail, or two-sided for the t and normal), cached by
+    # (distribution, df1, df2, alpha) with the same LRU policy as the tables
+    def critical_value(self, name, alpha = 0.05, df1 = None, df2 = None, alternative = "greater"):
+        key = (name, df1, df2, alpha, alternative)
+        if key in self.critical_values:
+            self.critical_values.move_to_end(key)
+            return self.critical_values[key]
+        if alternative not in ("greater", "two-sided"):
+            raise ValueError("alternative must be 'greater' or 'two-sided'")
+        value = distribution(name, df1, df2).isf(alpha / 2 if alternative == "two-sided" else alpha)
+        self.critical_values[key] = value
+        if len(self.critical_values) > 64 * self.max_tables:
+            self.critical_values.popitem(last = False)
+        return value
+
+
+if __name__ == "__main__":
+
+    import tempfile
+    import time
+
+    # Random seed
+    np.random.seed(42)
+
+    # Distribution tables
+    print("\nDistribution tables:\nInterpolated p-values for many statistics with the same degrees of freedom")
+
+    # Ten million t statistics with 99 degrees of freedom, and F statistics of a 3 group ANOVA on 60 observations
+    t_stats = np.random.standard_t(99, size = 10 ** 7)
+    F_stats = np.random.f(2, 57, size = 10 ** 7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tables = DistributionTables(directory = directory)
+        start = time.perf_counter()
+        p_table = tables.p_value("t", t_stats, 99)
+        p_f_table = tables.p_value("f", F_stats, 2, 57, alternative = "greater")
+        time_table = time.perf_counter() - start
+
+        # Compare with the library
+        start = time.perf_counter()
+        p_exact = 2 * t.sf(np.abs(t_stats), 99)
+        p_f_exact = f.sf(F_stats, 2, 57)
+        time_exact = time.perf_counter() - start
+        print(f"\nTable intervals: t = {tables.tables['t', 99, None][2][0].size}, F = {tables.tables['f', 2, 57][2][0].size}")
+        print(f"Time (tables, including the build): {time_table:.2f} s, (library): {time_exact:.2f} s")
+        print(f"Largest absolute error: t = {np.max(np.abs(p_table - p_exact)):.2e}, F = {np.max(np.abs(p_f_table - p_f_exact)):.2e}")
+        small = p_exact < 1e-4
+        print(f"Largest relative error of p-values below 1e-4: {np.max(np.abs(p_table[small] / p_exact[small] - 1)):.2e}")
+
+        # A second cache (e.g. another process) loads the stored tables instead of building them
+        start = time.perf_counter()
+        DistributionTables(directory = directory).table("t", 99)
+        print(f"Table loaded from disk in {time.perf_counter() - start:.4f} s")
+
+    # Critical values
+    print(f"\nCritical values at alpha = 0.05: t(99) two-sided = {tables.critical_value('t', 0.05, 99, alternative = 'two-sided'):.4f}, "
+          f"F(2, 57) = {tables.critical_value('f', 0.05, 2, 57):.4f}, chi2(9) = {tables.critical_value('chi2', 0.05, 9):.4f}")
@@ -0,0 +1,126 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import beta
+
+# Pooled observations shared with the worker processes (sent once, not once per block)
+_pooled = None
+
+def _init_worker(pooled):
+    global _pooled
+    _pooled = pooled
+
+# Sums of the smaller group for one block of random relabellings
+# Each row of the index block is a permutation of the pooled data, truncated to the group size
+def _permuted_sums(args):
+    seed, n_permutations, group_size = args
+    rng = np.random.default_rng(seed)
+    n_total = _pooled.size
+    indices = rng.permuted(np.broadcast_to(np.arange(n_total, dtype = np.int64), (n_permutations, n_total)), axis = 1)
+    return _pooled[indices[:, :group_size]].sum(axis = 1)
+
+# Clopper-Pearson confidence interval of a Monte Carlo p-value estimated from k exceedances in n draws
+def p_value_interval(k, n, confidence = 0.99):
+    tail = (1 - confidence) / 2
+    low = beta.ppf(tail, k, n - k + 1) if k > 0 else 0.0
+    high = beta.ppf(1 - tail, k + 1, n - k) if k < n else 1.0
+    return low, high
+
+# Permutation test for the difference of means between two groups
+# Permutations are drawn in index blocks of at most max_elements entries, spread across n_jobs processes
+# Sampling stops early once the confidence interval of the p-value lies entirely above or below alpha
+def permutation_test(sample1, sample2, n_permutations = 10000, alternative = "two-sided", alpha = 0.05,
+                     confidence = 0.99, early_stopping = True, max_elements = 2 ** 24, blocks_per_check = 8,
+                     n_jobs = 1, seed = None):
+    sample1 = np.asarray(sample1, dtype = float).ravel()
+    sample2 = np.asarray(sample2, dtype = float).ravel()
+    n1, n2 = sample1.size, sample2.size
+    pooled = np.concatenate([sample1, sample2])
+    total = pooled.sum()
+    observed = sample1.mean() - sample2.mean()
+
+    # Gather the smaller group, and recover the mean difference from its sum
+    group_size = min(n1, n2)
+    def mean_difference(sums):
+        other = total - sums
+        return sums / n1 - other / n2 if n1 <= n2 else other / n1 - sums / n2
+
+    # Compare permuted statistics with the observed one (small tolerance for rounding)
+    tolerance = 1e-12 * max(1.0, abs(observed))
+    def exceedances(statistics):
+        if alternative == "two-sided":
+            return np.count_nonzero(np.abs(statistics) >= abs(observed) - tolerance)
+        if alternative == "greater":
+            return np.count_nonzero(statistics >= observed - tolerance)
+        if alternative == "less":
+            return np.count_nonzero(statistics <= observed + tolerance)
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+    # Fixed block layout and seeds, so the answer does not depend on n_jobs
+    block = max(1, min(n_permutations, max_elements // pooled.size))
+    sizes = [min(block, n_permutations - start) for start in range(0, n_permutations, block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, group_size) for s, size in zip(seeds, sizes)]
+
+    executor = None
+    if n_jobs == 1:
+        _init_worker(pooled)
+        run = lambda batch: map(_permuted_sums, batch)
+    else:
+        executor = ProcessPoolExecutor(max_workers = n_jobs, initializer = _init_worker, initargs = (pooled, ))
+        run = lambda batch: executor.map(_permuted_sums, batch)
+
+    count, done = 0, 0
+    try:
+        for start in range(0, len(tasks), blocks_per_check):
+            batch = tasks[start:start + blocks_per_check]
+            for sums in run(batch):
+                count += exceedances(mean_difference(sums))
+            done += sum(task[1] for task in batch)
+            if early_stopping:
+                low, high = p_value_interval(count, done, confidence)
+                if high < alpha or low > alpha:
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Monte Carlo p-value, counting the observed labelling as one of the permutations
+    p_value = (count + 1) / (done + 1)
+    return observed, p_value, done, p_value_interval(count, done, confidence)
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(0)
+
+    # Permutation test
+    print("\nPermutation test:\nCompare sample means of two independent groups without assuming normality")
+
+    # Simulate two sets of skewed observations
+    sample1 = np.random.exponential(scale = 5, size = 30)
+    sample2 = np.random.exponential(scale = 10, size = 30)
+
+    # Permutation p-value
+    observed, p_value, n_used, interval = permutation_test(sample1, sample2, n_permutations = 100000, seed = 1)
+    print(f"\nMean difference = {observed:.4f}")
+    print(f"p-value (permutation) = {p_value:.4f} after {n_used} permutations")
+    print(f"99% interval of the p-value = ({interval[0]:.4f}, {interval[1]:.4f})")
+
+    # Compare with the t-test
+    from scipy.stats import ttest_ind
+    t_stat_scipy, p_value_scipy = ttest_ind(sample1, sample2)
+    print(f"\nUsing SciPy library:")
+    print(f"p-value (t-test) = {p_value_scipy:.4f}")
+
+    # Interpret result (significance level 0.05)
+    alpha = 0.05
+    if p_value < alpha:
+        print("Reject H0: Samples come from different distributions.")
+    else:
+        print("Accept H0: Samples come from same distribution.")
@@ -0,0 +1,159 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from functools import lru_cache
+from scipy.stats import norm
+
+# Tie-averaged ranks (1-based) of every column of an (n, p) matrix, plus the size of each element's tie group
+# One argsort per column, ties are resolved with running max / min over the sorted values
+def column_ranks(values):
+    n, p = values.shape
+    order = np.argsort(values, axis = 0, kind = "stable")
+    sorted_values = np.take_along_axis(values, order, axis = 0)
+    positions = np.broadcast_to(np.arange(n)[:, None], (n, p))
+    new_group = np.ones((n, p), dtype = bool)
+    new_group[1:] = sorted_values[1:] != sorted_values[:-1]
+    last_of_group = np.ones((n, p), dtype = bool)
+    last_of_group[:-1] = new_group[1:]
+    first = np.maximum.accumulate(np.where(new_group, positions, 0), axis = 0)
+    last = np.minimum.accumulate(np.where(last_of_group, positions, n - 1)[::-1], axis = 0)[::-1]
+    ranks, tie_sizes = np.empty((n, p)), np.empty((n, p))
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis = 0)
+    np.put_along_axis(tie_sizes, order, last - first + 1, axis = 0)
+    return ranks, tie_sizes
+
+# Exact null distribution of the signed-rank statistic W+ for n non-zero differences, P(W+ = w) for w = 0 .. n(n+1)/2
+# Built up from 1 to n ranks in a loop (each rank enters W+ with probability 1/2), cached across calls
+@lru_cache(maxsize = None)
+def signed_rank_distribution(n):
+    pmf = np.ones(1)
+    for k in range(1, n + 1):
+        grown = np.zeros(pmf.size + k)
+        grown[:pmf.size] += pmf / 2
+        grown[k:] += pmf / 2
+        pmf = grown
+    pmf.flags.writeable = False
+    return pmf
+
+# Exact null distribution of the Mann-Whitney U statistic of the first sample, P(U = u) for u = 0 .. n1 n2
+# Recurrence p(u; i, j) = i / (i + j) p(u - j; i - 1, j) + j / (i + j) p(u; i, j - 1), in a loop over i = 1 .. n1
+# that updates the pmfs of j = 0 .. n2 in place (the distribution is symmetric in n1 and n2, so j runs over the
+# smaller sample), cached by sample sizes. Time grows as (n1 n2)^2, so keep exact_max in the hundreds at most
+@lru_cache(maxsize = None)
+def mann_whitney_distribution(n1, n2):
+    n1, n2 = max(n1, n2), min(n1, n2)
+    row = [np.ones(1) for j in range(n2 + 1)]
+    for i in range(1, n1 + 1):
+        for j in range(1, n2 + 1):
+            pmf = np.zeros(i * j + 1)
+            pmf[j:j + row[j].size] += i / (i + j) * row[j]
+            pmf[:row[j - 1].size] += j / (i + j) * row[j - 1]
+            row[j] = pmf
+    pmf = row[n2]
+    pmf.flags.writeable = False
+    return pmf
+
+# P-values of integer statistics (array) from their exact pmf
+def _exact_p_value(pmf, statistics, alternative):
+    cdf = np.concatenate([[0.0], np.cumsum(pmf)])
+    statistics = np.rint(statistics).astype(np.int64)
+    lower, upper = cdf[statistics + 1], 1 - cdf[statistics]
+    if alternative == "greater":
+        return upper
+    if alternative == "less":
+        return lower
+    return np.minimum(1.0, 2 * np.minimum(lower, upper))
+
+# P-value from the normal approximation, with optional continuity correction
+def _normal_p_value(statistic, mean, sd, alternative, continuity):
+    correction = 0.5 if continuity else 0.0
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        if alternative == "greater":
+            return norm.sf((statistic - mean - correction) / sd)
+        if alternative == "less":
+            return norm.cdf((statistic - mean + correction) / sd)
+        z = (np.abs(statistic - mean) - correction) / sd
+        return np.minimum(1.0, 2 * norm.sf(np.maximum(z, 0.0)))
+
+# Wilcoxon signed-rank test for every column, nonparametric counterpart of ttest_1samp
+# x has shape (n, p) (or (n, )), differences are x - popmean (or x - y for paired samples)
+# Zero differences are dropped, ties get averaged ranks
+# Exact null distribution for up to exact_max non-zero differences without ties, else tie-corrected normal approximation
+def wilcoxon_signed_rank(x, y = None, popmean = 0.0, alternative = "two-sided", exact_max = 50, correction = False):
+    x = np.asarray(x, dtype = float)
+    one_column = x.ndim == 1
+    d = (x - (popmean if y is None else np.asarray(y, dtype = float))).reshape(x.shape[0], -1)
+    n_zero = np.sum(d == 0, axis = 0)
+    n_eff = d.shape[0] - n_zero
+
+    # Zeros have the smallest |d|, so removing them shifts every other rank by the number of zeros
+    ranks, tie_sizes = column_ranks(np.abs(d))
+    ranks -= n_zero
+    nonzero = d != 0
+    w_plus = np.sum(np.where(d > 0, ranks, 0.0), axis = 0)
+    ties = np.sum(np.where(nonzero, tie_sizes ** 2 - 1, 0.0), axis = 0)
+
+    mean = n_eff * (n_eff + 1) / 4
+    sd = np.sqrt(n_eff * (n_eff + 1) * (2 * n_eff + 1) / 24 - ties / 48)
+    p_values = np.asarray(_normal_p_value(w_plus, mean, sd, alternative, correction), dtype = float)
+    use_exact = (n_eff <= exact_max) & (ties == 0) & (n_zero == 0) & (n_eff > 0)
+    # Columns are grouped by their number of non-zero differences, so each exact distribution is built once
+    for size in np.unique(n_eff[use_exact]):
+        columns = np.flatnonzero(use_exact & (n_eff == size))
+        pmf = signed_rank_distribution(int(size))
+        p_values[columns] = _exact_p_value(pmf, w_plus[columns], alternative)
+    return (w_plus[0], p_values[0]) if one_column else (w_plus, p_values)
+
+# Mann-Whitney U test for every column, nonparametric counterpart of ttest_ind
+# x has shape (n1, p), y has shape (n2, p), one sort of the pooled column gives all ranks
+# Exact null distribution when both samples have at most exact_max observations and there are no ties
+def mann_whitney_u(x, y, alternative = "two-sided", exact_max = 50, continuity = True):
+    x, y = np.asarray(x, dtype = float), np.asarray(y, dtype = float)
+    one_column = x.ndim == 1
+    x, y = x.reshape(x.shape[0], -1), y.reshape(y.shape[0], -1)
+    n1, n2 = x.shape[0], y.shape[0]
+    n = n1 + n2
+    ranks, tie_sizes = column_ranks(np.vstack([x, y]))
+    u1 = ranks[:n1].sum(axis = 0) - n1 * (n1 + 1) / 2
+    ties = np.sum(tie_sizes ** 2 - 1, axis = 0)
+
+    mean = n1 * n2 / 2
+    sd = np.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    p_values = np.asarray(_normal_p_value(u1, mean, sd, alternative, continuity), dtype = float)
+    if n1 <= exact_max and n2 <= exact_max:
+        use_exact = ties == 0
+        pmf = mann_whitney_distribution(n1, n2)
+        p_values[use_exact] = _exact_p_value(pmf, u1[use_exact], alternative)
+    return (u1[0], p_values[0]) if one_column else (u1, p_values)
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(0)
+
+    # Rank tests
+    print("\nRank tests:\nCompare locations of skewed samples without assuming normality")
+
+    # 1000 features of skewed (log-normal) data, the last 200 with a shifted second group
+    sample1 = np.random.lognormal(mean = 0, sigma = 1, size = (25, 1000))
+    sample2 = np.random.lognormal(mean = 0, sigma = 1, size = (30, 1000))
+    sample2[:, -200:] *= 2
+
+    u_stat, p_values = mann_whitney_u(sample1, sample2)
+    print(f"\nMann-Whitney U: equal features rejected = {np.mean(p_values[:-200] < 0.05):.3f}, "
+          f"shifted features rejected = {np.mean(p_values[-200:] < 0.05):.3f}")
+
+    # Dice rolls (many ties): is the median 3.5?
+    rolls = np.random.randint(1, 7, size = 100)
+    w_stat, p_value = wilcoxon_signed_rank(rolls, popmean = 3.5)
+    print(f"\nWilcoxon signed-rank on dice rolls: W+ = {w_stat:.1f}, p-value = {p_value:.4f}")
+
+    # Compare with precompiled libraries
+    from scipy.stats import mannwhitneyu, wilcoxon
+    print(f"\nFirst feature: U = {u_stat[0]:.1f}, p-value = {p_values[0]:.4f} "
+          f"(scipy: {mannwhitneyu(sample1[:, 0], sample2[:, 0], method = 'exact').pvalue:.4f})")
+    print(f"Dice rolls (scipy): p-value = {wilcoxon(rolls - 3.5).pvalue:.4f}")
@@ -0,0 +1,140 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from scipy.stats import chi2, f, nct, ncf, ncx2, t
+
+# Effect sizes .......................................................................................
+
+# Cohen's d of a coin with probability of heads p, tested against a fair coin
+def coin_effect(p, p0 = 0.5):
+    p = np.asarray(p, dtype = float)
+    return (p - p0) / np.sqrt(p * (1 - p))
+
+# Cohen's f of group means with a common standard deviation (groups along the last axis)
+def cohen_f(means, sd):
+    means = np.asarray(means, dtype = float)
+    return np.std(means, axis = -1) / np.asarray(sd, dtype = float)
+
+# Cohen's w between the probabilities under H0 and under H1 (categories along the last axis)
+def cohen_w(p0, p1):
+    p0, p1 = np.asarray(p0, dtype = float), np.asarray(p1, dtype = float)
+    return np.sqrt(np.sum((p1 - p0) ** 2 / p0, axis = -1))
+
+# Power functions, every argument broadcasts against the others ....................................
+
+# Power of the t-test for standardized effect d with n observations (per group for the two-sample test)
+# The t statistic follows a noncentral t with noncentrality d sqrt(n) (one sample) or d sqrt(n / 2) (two samples)
+# Lower tails are written as P(T > c) with the opposite noncentrality, nct.cdf returns NaN far in the lower tail
+def t_power(effect, n, alpha = 0.05, alternative = "two-sided", test = "one-sample"):
+    effect, n, alpha = (np.asarray(x, dtype = float) for x in (effect, n, alpha))
+    if test == "one-sample":
+        df, noncentrality = n - 1, effect * np.sqrt(n)
+    elif test == "two-sample":
+        df, noncentrality = 2 * n - 2, effect * np.sqrt(n / 2)
+    else:
+        raise ValueError("test must be 'one-sample' or 'two-sample'")
+    if alternative == "two-sided":
+        critical = t.isf(alpha / 2, df)
+        return nct.sf(critical, df, noncentrality) + nct.sf(critical, df, -noncentrality)
+    if alternative == "greater":
+        return nct.sf(t.isf(alpha, df), df, noncentrality)
+    if alternative == "less":
+        return nct.sf(t.isf(alpha, df), df, -noncentrality)
+    raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+# Power of the one-way ANOVA F-test for Cohen's f with k groups of n observations each
+# The F statistic follows a noncentral F with noncentrality f^2 k n
+def anova_power(effect, n, k = 3, alpha = 0.05):
+    effect, n, k, alpha = (np.asarray(x, dtype = float) for x in (effect, n, k, alpha))
+    df_between, df_within = k - 1, k * (n - 1)
+    return ncf.sf(f.isf(alpha, df_between, df_within), df_between, df_within, effect ** 2 * k * n)
+
+# Power of the chi-square test (goodness of fit or independence) for Cohen's w with n observations
+# The statistic follows a noncentral chi-square with noncentrality w^2 n
+def chi2_power(effect, n, df = 1, alpha = 0.05):
+    effect, n, df, alpha = (np.asarray(x, dtype = float) for x in (effect, n, df, alpha))
+    return ncx2.sf(chi2.isf(alpha, df), df, effect ** 2 * n)
+
+# Power functions by name
+power_functions = {"t": t_power, "anova": anova_power, "chi2": chi2_power}
+
+# Power over a full grid of effect sizes x alphas x sample sizes in one call, shape (effects, alphas, sizes)
+def power_grid(power, effect_sizes, alphas, sample_sizes, **design):
+    effect_sizes = np.asarray(effect_sizes, dtype = float)[:, None, None]
+    alphas = np.asarray(alphas, dtype = float)[None, :, None]
+    sample_sizes = np.asarray(sample_sizes, dtype = float)[None, None, :]
+    return power(effect_sizes, sample_sizes, alpha = alphas, **design)
+
+# Batched root finder ................................................................................
+
+# Smallest integer n in [n_min, n_max] with power(effect, n, **design) >= target, for every scenario at once
+# effect, target and the array entries of design broadcast to the scenario shape, and every bisection step
+# evaluates the power of all unresolved scenarios in one vectorized call (about log2(n_max) steps)
+# Scenarios that do not reach the target by n_max return -1
+def minimum_sample_size(power, effect, target = 0.8, n_min = 2, n_max = 10 ** 7, **design):
+    arrays = {name: value for name, value in design.items() if not isinstance(value, str)}
+    options = {name: value for name, value in design.items() if isinstance(value, str)}
+    shape = np.broadcast_shapes(np.shape(effect), np.shape(target), *(np.shape(value) for value in arrays.values()))
+    effect = np.broadcast_to(np.asarray(effect, dtype = float), shape).ravel()
+    target = np.broadcast_to(np.asarray(target, dtype = float), shape).ravel()
+    arrays = {name: np.broadcast_to(np.asarray(value, dtype = float), shape).ravel() for name, value in arrays.items()}
+
+    def power_at(n, rows):
+        return power(effect[rows], n, **{name: value[rows] for name, value in arrays.items()}, **options)
+
+    everything = np.arange(effect.size)
+    low = np.full(effect.size, n_min - 1, dtype = np.int64)
+    high = np.full(effect.size, n_max, dtype = np.int64)
+    result = np.full(effect.size, -1, dtype = np.int64)
+    enough_at_min = power_at(np.full(effect.size, n_min), everything) >= target
+    result[enough_at_min] = n_min
+    reachable = ~enough_at_min & (power_at(np.full(effect.size, n_max), everything) >= target)
+
+    # Invariant: power(low) < target <= power(high) for the active scenarios
+    active = np.flatnonzero(reachable)
+    while active.size:
+        middle = (low[active] + high[active]) // 2
+        enough = power_at(middle, active) >= target[active]
+        high[active] = np.where(enough, middle, high[active])
+        low[active] = np.where(enough, low[active], middle)
+        active = active[high[active] - low[active] > 1]
+    result[reachable] = high[reachable]
+    return result.reshape(shape)
+
+
+if __name__ == "__main__":
+
+    import time
+
+    # Power of the designs used in the exercises .....................................................
+    print("\nPower of the designs used in the exercises (alpha = 0.05):")
+    print(f"100 coin tosses, p(heads) = 0.6: {t_power(coin_effect(0.6), 100):.3f}")
+    print(f"Two samples of 30, difference of 5 with sd 5: {t_power(1.0, 30, test = 'two-sample'):.3f}")
+    print(f"ANOVA, 3 groups of 10, means 5, 5, 5.5 with sd 1: {anova_power(cohen_f([5, 5, 5.5], 1), 10, k = 3):.3f}")
+    human_bias = np.array([1, 1, 2, 1, 2, 1, 2, 1, 2, 1]) / 14
+    print(f"10 people choosing 3 numbers, human bias: {chi2_power(cohen_w(np.full(10, 0.1), human_bias), 30, df = 9):.3f}")
+
+    # Minimum sample sizes
+    print("\nMinimum sample size for 80% power:")
+    print(f"Coin with p(heads) = 0.6: {minimum_sample_size(t_power, coin_effect(0.6))} tosses")
+    print(f"ANOVA with means 5, 5, 5.5: {minimum_sample_size(anova_power, cohen_f([5, 5, 5.5], 1), k = 3)} per group")
+    print(f"Human bias in number choices: {minimum_sample_size(chi2_power, cohen_w(np.full(10, 0.1), human_bias), df = 9)} choices")
+
+    # Compare with simulation
+    from t_test_power import simulate_power
+    effect_sizes, sample_sizes = np.array([0.2, 0.5]), np.array([20, 50, 100])
+    analytic = power_grid(t_power, effect_sizes, [0.05], sample_sizes)[:, 0, :]
+    simulated = simulate_power(effect_sizes, sample_sizes, n_replicates = 20000, seed = 0)
+    print("\nPower of the one sample t-test, analytic vs simulated (20000 replicates):")
+    for i, effect in enumerate(effect_sizes):
+        print(f"d = {effect}: " + ", ".join(f"n = {n}: {a:.3f} / {s:.3f}" for n, a, s in zip(sample_sizes, analytic[i], simulated[i])))
+
+    # Thousands of design scenarios at once
+    effect_grid, alpha_grid, power_targets = np.meshgrid(np.linspace(0.05, 1, 100), [0.001, 0.01, 0.05, 0.1], [0.8, 0.9, 0.95], indexing = "ij")
+    start = time.perf_counter()
+    n_needed = minimum_sample_size(t_power, effect_grid, power_targets, alpha = alpha_grid, test = "two-sample")
+    print(f"\nMinimum n per group for {n_needed.size} two-sample scenarios in {time.perf_counter() - start:.2f} s, "
+          f"from {n_needed.min()} to {n_needed.max()}")
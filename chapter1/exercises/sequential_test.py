@@ -0,0 +1,271 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from scipy.optimize import brentq
+from scipy.stats import norm, t
+from t_test_power import dice_probabilities, null_means
+from t_test_streaming import RunningMoments
+
+# Sequential probability ratio test ..................................................................
+
+# Wald's SPRT of H0: outcome probabilities p0 against H1: p1, for discrete observations
+# (coin tosses 0 / 1, or dice faces 1 .. 6 with first_outcome = 1)
+# Every observation adds log p1 / p0 of its outcome to the log-likelihood ratio, the test rejects H0 when it
+# reaches log((1 - beta) / alpha) and accepts H0 when it falls to log(beta / (1 - alpha))
+class SPRT:
+
+    def __init__(self, p0, p1, alpha = 0.05, beta = 0.2, first_outcome = 0):
+        self.p0, self.p1 = np.asarray(p0, dtype = float), np.asarray(p1, dtype = float)
+        self.increments = np.log(self.p1) - np.log(self.p0)
+        self.alpha, self.beta = alpha, beta
+        self.upper, self.lower = np.log((1 - beta) / alpha), np.log(beta / (1 - alpha))
+        self.first_outcome = first_outcome
+        self.llr = 0.0
+        self.n = 0
+        self.decision = None
+
+    # Add observations one by one (or a chunk of them), stopping at the first boundary crossing
+    # Observations after the crossing are not used, n counts the observations actually taken
+    # Outcomes must be integers in first_outcome .. first_outcome + len(p0) - 1
+    def update(self, observations):
+        observations = np.asarray(observations).ravel()
+        codes = observations.astype(np.int64) - self.first_outcome
+        if np.any(codes != observations - self.first_outcome) or np.any((codes < 0) | (codes >= self.increments.size)):
+            raise ValueError(f"outcomes must be integers from {self.first_outcome} to {self.first_outcome + self.increments.size - 1}")
+        if self.decision is not None:
+            return self
+        path = self.llr + np.cumsum(self.increments[codes])
+        crossed = (path >= self.upper) | (path <= self.lower)
+        stop = int(np.argmax(crossed)) if crossed.any() else path.size - 1
+        if path.size:
+            self.llr = path[stop]
+            self.n += stop + 1
+        if crossed.any():
+            self.decision = "reject H0" if self.llr >= self.upper else "accept H0"
+        return self
+
+    # Wald's approximation of the expected sample number when the outcomes have probabilities p (p0 and p1 by default),
+    # E[N] = (P(reject) log A + P(accept) log B) / E[log-likelihood ratio increment], ignoring the overshoot of the boundaries
+    def expected_sample_number(self, p = None):
+        if p is None:
+            return {"H0": self.expected_sample_number(self.p0), "H1": self.expected_sample_number(self.p1)}
+        drift = np.dot(p, self.increments)
+        if np.isclose(drift, 0):
+            return float(-self.lower * self.upper / np.dot(p, self.increments ** 2))
+        # Operating characteristic from the root h != 0 of sum p (p1 / p0)^h = 1
+        h = brentq(lambda h: np.dot(p, np.exp(h * self.increments)) - 1, *((1e-6, 50) if drift < 0 else (-50, -1e-6)))
+        accept = (np.exp(h * self.upper) - 1) / (np.exp(h * self.upper) - np.exp(h * self.lower))
+        return float((accept * self.lower + (1 - accept) * self.upper) / drift)
+
+    def to_dict(self):
+        return {"p0": self.p0.tolist(), "p1": self.p1.tolist(), "alpha": self.alpha, "beta": self.beta,
+                "first_outcome": self.first_outcome, "llr": self.llr, "n": self.n, "decision": self.decision}
+
+    @classmethod
+    def from_dict(cls, state):
+        test = cls(state["p0"], state["p1"], state["alpha"], state["beta"], state["first_outcome"])
+        test.llr, test.n, test.decision = state["llr"], state["n"], state["decision"]
+        return test
+
+# SPRT of a fair coin against a coin with probability p1 of heads
+def coin_sprt(p1, alpha = 0.05, beta = 0.2):
+    return SPRT([0.5, 0.5], [1 - p1, p1], alpha, beta)
+
+# SPRT of a fair die against the die tilted by effect (see dice_probabilities)
+def dice_sprt(effect, alpha = 0.05, beta = 0.2):
+    return SPRT(np.full(6, 1 / 6), dice_probabilities(effect), alpha, beta, first_outcome = 1)
+
+# Group sequential t-test ............................................................................
+
+# Lan-DeMets alpha-spending functions, cumulative type I error spent at information fraction tau
+spending_functions = {
+    "obrien-fleming": lambda alpha, tau: 2 * norm.sf(norm.isf(alpha / 2) / np.sqrt(tau)),
+    "pocock": lambda alpha, tau: alpha * np.log(1 + (np.e - 1) * tau),
+}
+
+# Probabilities of leaving the continuation region at every look (upper and lower boundary), for a
+# Brownian motion observed at information fractions tau with drift theta (the mean of the final z statistic)
+# The density of the continuing paths is carried from look to look on a grid of n_grid points
+# If boundaries is None, each boundary is solved from the alpha-spending increments instead (under theta = 0)
+def _boundary_crossing(information, theta = 0.0, boundaries = None, spent = None, n_grid = 801):
+    grid, density = np.zeros(1), np.ones(1)
+    previous = 0.0
+    solved, upper_exits, lower_exits = [], [], []
+    for k, tau in enumerate(information):
+        delta = tau - previous
+        mean = grid + theta * delta
+
+        # Exit probabilities through the boundaries c sqrt(tau) of the Brownian motion W(tau) = Z sqrt(tau)
+        def exits(c):
+            b = c * np.sqrt(tau)
+            return (np.dot(density, norm.sf((b - mean) / np.sqrt(delta))),
+                    np.dot(density, norm.cdf((-b - mean) / np.sqrt(delta))))
+
+        if boundaries is None:
+            target = spent[k] - (spent[k - 1] if k else 0.0)
+            c = brentq(lambda c: sum(exits(c)) - target, 0.0, 40.0)
+        else:
+            c = boundaries[k]
+        upper, lower = exits(c)
+        solved.append(c)
+        upper_exits.append(upper)
+        lower_exits.append(lower)
+
+        # Density (times trapezoid weights) of the paths still inside the boundaries
+        b = c * np.sqrt(tau)
+        new_grid = np.linspace(-b, b, n_grid)
+        weights = np.full(n_grid, new_grid[1] - new_grid[0])
+        weights[[0, -1]] /= 2
+        density = weights * (norm.pdf((new_grid[:, None] - mean[None, :]) / np.sqrt(delta)) @ density) / np.sqrt(delta)
+        grid, previous = new_grid, tau
+    return np.array(solved), np.array(upper_exits), np.array(lower_exits)
+
+# Two-sided z boundaries of a group sequential test with n_looks equally spaced looks
+def group_sequential_boundaries(n_looks, alpha = 0.05, spending = "obrien-fleming"):
+    information = np.arange(1, n_looks + 1) / n_looks
+    spent = spending_functions[spending](alpha, information)
+    spent[-1] = alpha
+    return _boundary_crossing(information, spent = spent)[0]
+
+# One sample group sequential t-test: after each group of group_size observations the t statistic is
+# converted to the z score with the same p-value and compared with the alpha-spending boundary
+# Observations are taken one by one or in chunks, with O(1) work per observation (running moments)
+class GroupSequentialTTest:
+
+    def __init__(self, n_looks, group_size, popmean = 0.0, alpha = 0.05, spending = "obrien-fleming"):
+        self.n_looks, self.group_size = n_looks, group_size
+        self.popmean, self.alpha, self.spending = popmean, alpha, spending
+        self.boundaries = group_sequential_boundaries(n_looks, alpha, spending)
+        self.moments = RunningMoments()
+        self.look = 0
+        self.decision = None
+
+    @property
+    def n(self):
+        return self.moments.count
+
+    # z score with the same two-sided p-value as the current t statistic
+    def z_score(self):
+        t_stat = (self.moments.mean - self.popmean) / np.sqrt(self.moments.variance / self.n)
+        return np.sign(t_stat) * norm.isf(t.sf(np.abs(t_stat), self.n - 1))
+
+    # Add observations, checking the boundary whenever a group is complete
+    def update(self, observations):
+        observations = np.asarray(observations, dtype = float).ravel()
+        start = 0
+        while self.decision is None and start < observations.size:
+            take = min(observations.size - start, (self.look + 1) * self.group_size - self.n)
+            self.moments.update(observations[start:start + take])
+            start += take
+            if self.n == (self.look + 1) * self.group_size:
+                z = self.z_score()
+                self.look += 1
+                if np.abs(z) >= self.boundaries[self.look - 1]:
+                    self.decision = "reject H0"
+                elif self.look == self.n_looks:
+                    self.decision = "accept H0"
+        return self
+
+    # Expected number of observations for a standardized effect (mean shift / sd), normal approximation
+    def expected_sample_number(self, effect = 0.0):
+        information = np.arange(1, self.n_looks + 1) / self.n_looks
+        theta = effect * np.sqrt(self.n_looks * self.group_size)
+        _, upper, lower = _boundary_crossing(information, theta, self.boundaries)
+        stop = upper + lower
+        stop[-1] = 1 - stop[:-1].sum()
+        return float(np.dot(stop, np.arange(1, self.n_looks + 1) * self.group_size))
+
+# Vectorized simulators ..............................................................................
+
+# Simulate the SPRT on n_replicates streams of outcomes drawn with probabilities p, at most n_max each
+# Streams are generated in blocks of at most max_elements outcomes, with a SeedSequence child per block
+# Streams that do not cross a boundary by n_max decide by the sign of their log-likelihood ratio
+# Returns the sample number of every replicate and whether it rejected H0
+def simulate_sprt(test, p, n_replicates = 10000, n_max = 1000, max_elements = 2 ** 22, seed = None):
+    p = np.asarray(p, dtype = float)
+    block = max(1, max_elements // n_max)
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_replicates // block))
+    sample_number = np.empty(n_replicates, dtype = np.int64)
+    rejected = np.empty(n_replicates, dtype = bool)
+    for seed_child, start in zip(seeds, range(0, n_replicates, block)):
+        rng = np.random.default_rng(seed_child)
+        size = min(block, n_replicates - start)
+        outcomes = np.searchsorted(np.cumsum(p)[:-1], rng.random((size, n_max)), side = "right")
+        path = np.cumsum(test.increments[outcomes], axis = 1)
+        crossed = (path >= test.upper) | (path <= test.lower)
+        stop = np.where(crossed.any(axis = 1), np.argmax(crossed, axis = 1), n_max - 1)
+        final = path[np.arange(size), stop]
+        sample_number[start:start + size] = stop + 1
+        rejected[start:start + size] = np.where(crossed.any(axis = 1), final >= test.upper, final > 0)
+    return sample_number, rejected
+
+# Simulate the group sequential t-test with data from sampler (see t_test_power) shifted by effect
+# Running sums at every look give all t statistics of a block of replicates at once
+def simulate_group_sequential(test, sampler, effect, n_replicates = 10000, max_elements = 2 ** 22, seed = None):
+    looks = np.arange(1, test.n_looks + 1) * test.group_size
+    n_max = looks[-1]
+    block = max(1, max_elements // n_max)
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_replicates // block))
+    sample_number = np.empty(n_replicates, dtype = np.int64)
+    rejected = np.empty(n_replicates, dtype = bool)
+    for seed_child, start in zip(seeds, range(0, n_replicates, block)):
+        size = min(block, n_replicates - start)
+        data = sampler(np.random.default_rng(seed_child), (size, n_max), effect) - test.popmean
+        sums = np.cumsum(data, axis = 1)[:, looks - 1]
+        squares = np.cumsum(data ** 2, axis = 1)[:, looks - 1]
+        variance = (squares - sums ** 2 / looks) / (looks - 1)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            t_stat = sums / looks / np.sqrt(variance / looks)
+        z = np.sign(t_stat) * norm.isf(t.sf(np.abs(t_stat), looks - 1))
+        crossed = np.abs(z) >= test.boundaries
+        first = np.where(crossed.any(axis = 1), np.argmax(crossed, axis = 1), test.n_looks - 1)
+        sample_number[start:start + size] = looks[first]
+        rejected[start:start + size] = crossed.any(axis = 1)
+    return sample_number, rejected
+
+
+if __name__ == "__main__":
+
+    from t_test_power import dice_sampler, simulate_power
+
+    # Random seed
+    np.random.seed(42)
+
+    # Sequential test of a coin, one toss at a time
+    print("\nSequential probability ratio test:\nStop tossing the coin as soon as the evidence is strong enough")
+    coin = coin_sprt(0.7)
+    for toss in np.random.choice([0, 1], size = 100, p = [0.3, 0.7]):
+        coin.update(toss)
+        if coin.decision is not None:
+            break
+    print(f"\nBiased coin (p = 0.7): {coin.decision} after {coin.n} tosses, log-likelihood ratio = {coin.llr:.3f}")
+    print(f"Expected tosses (Wald): {coin.expected_sample_number()}")
+
+    # Dice, observations arriving in chunks of 10 rolls
+    die = dice_sprt(0.5)
+    rolls = np.random.choice(np.arange(1, 7), size = 100, p = dice_probabilities(0.5))
+    for chunk in np.split(rolls, 10):
+        if die.update(chunk).decision is not None:
+            break
+    print(f"\nLoaded die (mean 4.0): {die.decision} after {die.n} rolls")
+
+    # Average savings against the fixed 100 roll t-test with the same type I error
+    print("\nSimulated sample numbers against the fixed-n t-test (alpha = 0.05, 20000 replicates):")
+    n_fixed = 100
+    for effect in [0.0, 0.3, 0.5]:
+        test = dice_sprt(0.5)
+        numbers, rejected = simulate_sprt(test, dice_probabilities(effect), n_replicates = 20000, seed = 1)
+        power_fixed = simulate_power([effect], [n_fixed], n_replicates = 20000, sampler = dice_sampler, seed = 1)[0, 0]
+        print(f"die effect = {effect}: SPRT mean rolls = {numbers.mean():.1f} (rejects {rejected.mean():.3f}), "
+              f"fixed t-test {n_fixed} rolls (rejects {power_fixed:.3f}), savings = {1 - numbers.mean() / n_fixed:.1%}")
+
+    # Group sequential t-test: 5 looks of 20 rolls each, O'Brien-Fleming boundaries
+    gst = GroupSequentialTTest(n_looks = 5, group_size = 20, popmean = null_means[dice_sampler])
+    print("\nGroup sequential t-test, O'Brien-Fleming boundaries:", np.round(gst.boundaries, 3))
+    for effect in [0.0, 0.3, 0.5]:
+        numbers, rejected = simulate_group_sequential(gst, dice_sampler, effect, n_replicates = 20000, seed = 2)
+        print(f"die effect = {effect}: mean rolls = {numbers.mean():.1f} (expected {gst.expected_sample_number(effect / np.sqrt(35 / 12)):.1f}), "
+              f"rejects {rejected.mean():.3f}, savings = {1 - numbers.mean() / n_fixed:.1%}")
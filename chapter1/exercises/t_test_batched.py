@@ -0,0 +1,101 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from scipy.stats import t
+
+# P-value of a t statistic for the chosen alternative hypothesis
+# tables (a DistributionTables cache) interpolates the p-values instead of evaluating the t distribution
+def t_p_value(t_stat, df, alternative = "two-sided", tables = None):
+    if tables is not None:
+        return tables.p_value("t", t_stat, df, alternative = alternative)
+    if alternative == "two-sided":
+        return 2 * t.sf(np.abs(t_stat), df)
+    if alternative == "greater":
+        return t.sf(t_stat, df)
+    if alternative == "less":
+        return t.cdf(t_stat, df)
+    raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+# Pad a list of 1-D samples of different lengths into an (m, n) matrix
+def pad_ragged(samples, fill_value = np.nan):
+    lengths = np.array([len(sample) for sample in samples], dtype = np.int64)
+    matrix = np.full((len(samples), lengths.max(initial = 0)), fill_value, dtype = float)
+    for i, sample in enumerate(samples):
+        matrix[i, :lengths[i]] = sample
+    return matrix, lengths
+
+# One sample t-test for every row of an (m, n) matrix in one vectorized pass
+# NaN entries are ignored, and lengths[i] (if given) keeps only the first lengths[i] values of row i
+# Rows are processed in blocks of block_rows so temporaries stay bounded on large inputs
+def ttest_1samp_batched(samples, popmean = 0.0, alternative = "two-sided", lengths = None, block_rows = 4096, tables = None):
+    samples = np.atleast_2d(np.asarray(samples, dtype = float))
+    m, n = samples.shape
+    popmean = np.broadcast_to(np.asarray(popmean, dtype = float), (m, ))
+    if lengths is not None:
+        lengths = np.broadcast_to(np.asarray(lengths, dtype = np.int64), (m, ))
+        if np.any(lengths < 0) or np.any(lengths > n):
+            raise ValueError("lengths must lie between 0 and the number of columns")
+
+    t_stats = np.empty(m)
+    counts = np.empty(m, dtype = np.int64)
+    for start in range(0, m, block_rows):
+        stop = min(start + block_rows, m)
+        block = samples[start:stop]
+
+        # Mask of valid observations (not NaN and inside the ragged length)
+        valid = ~np.isnan(block)
+        if lengths is not None:
+            valid &= np.arange(n) < lengths[start:stop, None]
+
+        # Two-pass mean and variance over the valid entries only
+        count = valid.sum(axis = 1)
+        mean = np.where(valid, block, 0.0).sum(axis = 1) / np.maximum(count, 1)
+        deviations = np.where(valid, block - mean[:, None], 0.0)
+        var = np.einsum("ij,ij->i", deviations, deviations) / np.maximum(count - 1, 1)
+
+        # t statistic, undefined (NaN) for rows with fewer than two observations
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            t_block = (mean - popmean[start:stop]) / np.sqrt(var / count)
+        t_block[count < 2] = np.nan
+        t_stats[start:stop] = t_block
+        counts[start:stop] = count
+
+    df = counts - 1
+    p_values = t_p_value(t_stats, np.where(df > 0, df, np.nan), alternative, tables)
+    return t_stats, p_values, df
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(42)
+
+    # Batched one sample t-test
+    print("\nBatched one sample t-test:\nCompare many sample means to hypothesized value at once")
+
+    # Simulate 10000 series of 100 coin tosses (1 = heads, 0 = tails), half of them biased
+    m, n = 10000, 100
+    p_heads = np.where(np.arange(m) < m // 2, 0.5, 0.7)
+    observations = (np.random.random((m, n)) < p_heads[:, None]).astype(float)
+
+    # Drop some tosses to get ragged series
+    lengths = np.random.randint(50, n + 1, size = m)
+
+    # Two-sided and one-sided tests for all series
+    t_stats, p_values, df = ttest_1samp_batched(observations, popmean = 0.5, lengths = lengths)
+    _, p_values_greater, _ = ttest_1samp_batched(observations, popmean = 0.5, alternative = "greater", lengths = lengths)
+
+    # Compare with the library on the first series
+    from scipy.stats import ttest_1samp
+    t_stat_scipy, p_value_scipy = ttest_1samp(observations[0, :lengths[0]], popmean = 0.5)
+    print(f"\nT statistic (batched): {t_stats[0]:.4f}, (library): {t_stat_scipy:.4f}")
+    print(f"P-value (batched): {p_values[0]:.4f}, (library): {p_value_scipy:.4f}")
+
+    # Interpret result (significance level 0.05)
+    alpha = 0.05
+    print(f"\nFair coins rejected (two-sided): {np.mean(p_values[:m // 2] < alpha):.3f}")
+    print(f"Biased coins rejected (two-sided): {np.mean(p_values[m // 2:] < alpha):.3f}")
+    print(f"Biased coins rejected (one-sided): {np.mean(p_values_greater[m // 2:] < alpha):.3f}")
@@ -0,0 +1,119 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import t
+
+# Gaussian observations (scale 1) shifted by the effect size
+def normal_sampler(rng, shape, effect):
+    return rng.standard_normal(shape) + effect
+
+# Face probabilities of a die tilted so the expected value is 3.5 + effect
+# (valid for |effect| <= 7 / 6, effect = 0 is the fair die)
+def dice_probabilities(effect):
+    probabilities = 1 / 6 + effect * (np.arange(1, 7) - 3.5) / 17.5
+    if np.any(probabilities < 0):
+        raise ValueError("effect too large for a six-sided die")
+    return probabilities
+
+# Dice rolls of the tilted die
+def dice_sampler(rng, shape, effect):
+    probabilities = dice_probabilities(effect)
+    return np.searchsorted(np.cumsum(probabilities)[:-1], rng.random(shape), side = "right") + 1.0
+
+# Expected value of each sampler under H0 (effect = 0), the default null mean of the one sample test
+null_means = {normal_sampler: 0.0, dice_sampler: 3.5}
+
+# Critical region of the t-test as a boolean rejection for an array of t statistics
+def reject(t_stat, df, alpha, alternative):
+    if alternative == "two-sided":
+        return np.abs(t_stat) > t.ppf(1 - alpha / 2, df)
+    if alternative == "greater":
+        return t_stat > t.ppf(1 - alpha, df)
+    if alternative == "less":
+        return t_stat < t.ppf(alpha, df)
+    raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+# Count rejections for one block of replicates of a single (effect, n) design
+def _rejections_block(args):
+    seed, n_replicates, effect, n, alpha, alternative, test, sampler, null_mean = args
+    rng = np.random.default_rng(seed)
+    sample1 = sampler(rng, (n_replicates, n), effect)
+    mean1, var1 = sample1.mean(axis = 1), sample1.var(axis = 1, ddof = 1)
+    if test == "one-sample":
+        t_stat = (mean1 - null_mean) / np.sqrt(var1 / n)
+        df = n - 1
+    else:
+        # Second group always drawn under H0, equal sizes so pooled and Welch SE coincide
+        sample2 = sampler(rng, (n_replicates, n), 0.0)
+        mean2, var2 = sample2.mean(axis = 1), sample2.var(axis = 1, ddof = 1)
+        t_stat = (mean1 - mean2) / np.sqrt((var1 + var2) / n)
+        df = 2 * n - 2
+    return int(np.count_nonzero(reject(t_stat, df, alpha, alternative)))
+
+# Empirical rejection rate of the t-test over a grid of effect sizes x sample sizes
+# Replicates are simulated in blocks of at most max_elements random numbers, so memory stays bounded
+# Each block has its own SeedSequence child, so results do not depend on n_jobs
+# null_mean is the mean under H0 of the one sample test, looked up in null_means for the samplers defined here
+def simulate_power(effect_sizes, sample_sizes, n_replicates = 10000, alpha = 0.05, alternative = "two-sided",
+                   test = "one-sample", sampler = normal_sampler, null_mean = None, max_elements = 2 ** 22, n_jobs = 1,
+                   seed = None):
+    if test not in ("one-sample", "two-sample"):
+        raise ValueError("test must be 'one-sample' or 'two-sample'")
+    if null_mean is None:
+        if test == "one-sample" and sampler not in null_means:
+            raise ValueError("give null_mean for a sampler that is not in null_means")
+        null_mean = null_means.get(sampler, 0.0)
+    effect_sizes = np.atleast_1d(np.asarray(effect_sizes, dtype = float))
+    sample_sizes = np.atleast_1d(np.asarray(sample_sizes, dtype = np.int64))
+
+    # One task per block of replicates for every design in the grid
+    cell_seeds = np.random.SeedSequence(seed).spawn(effect_sizes.size * sample_sizes.size)
+    tasks, cells = [], []
+    for cell, (effect, n) in enumerate((e, n) for e in effect_sizes for n in sample_sizes):
+        block = max(1, max_elements // int(n))
+        n_blocks = -(-n_replicates // block)
+        for seed_child, start in zip(cell_seeds[cell].spawn(n_blocks), range(0, n_replicates, block)):
+            size = min(block, n_replicates - start)
+            tasks.append((seed_child, size, effect, int(n), alpha, alternative, test, sampler, float(null_mean)))
+            cells.append(cell)
+
+    if n_jobs == 1:
+        counts = list(map(_rejections_block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers = n_jobs) as executor:
+            counts = list(executor.map(_rejections_block, tasks, chunksize = max(1, len(tasks) // (4 * (n_jobs or 1)))))
+
+    rejections = np.bincount(cells, weights = counts, minlength = effect_sizes.size * sample_sizes.size)
+    return rejections.reshape(effect_sizes.size, sample_sizes.size) / n_replicates
+
+# False positive rate is the rejection rate under H0 (effect = 0)
+def simulate_type_one_error(sample_sizes, **kwargs):
+    return simulate_power([0.0], sample_sizes, **kwargs)[0]
+
+
+if __name__ == "__main__":
+
+    # Power of the dice experiments
+    print("\nMonte Carlo power of the t-test:\nHow often do we detect a loaded die?")
+
+    effect_sizes = [0.0, 0.1, 0.2, 0.3, 0.5]
+    sample_sizes = [20, 50, 100, 200]
+    power = simulate_power(effect_sizes, sample_sizes, n_replicates = 20000, sampler = dice_sampler, n_jobs = 2, seed = 42)
+    power_one_sided = simulate_power(effect_sizes, sample_sizes, n_replicates = 20000, alternative = "greater",
+                                     sampler = dice_sampler, seed = 42)
+
+    # Print results
+    print("\nTwo-sided test, rows = shift of the mean, columns = number of rolls", sample_sizes)
+    for effect, row in zip(effect_sizes, power):
+        print(f"effect = {effect:.1f}: ", np.round(row, 3))
+    print("\nOne-sided test, rows = shift of the mean, columns = number of rolls", sample_sizes)
+    for effect, row in zip(effect_sizes, power_one_sided):
+        print(f"effect = {effect:.1f}: ", np.round(row, 3))
+
+    # Type I error of the two sample t-test on gaussian data
+    type_one = simulate_type_one_error([10, 30, 100], n_replicates = 20000, test = "two-sample", seed = 0)
+    print("\nFalse positive rate (two sample, alpha = 0.05): ", np.round(type_one, 3))
@@ -0,0 +1,121 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 1. Parameter estimation and hypotesis testing.
+
+# Import libraries
+import numpy as np
+from t_test_batched import t_p_value
+
+# Running count, mean and sum of squared deviations (Welford / Chan et al. update)
+class RunningMoments:
+
+    def __init__(self, count = 0, mean = 0.0, m2 = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    # Merge the moments of a chunk (count, mean, m2) into the running moments
+    def _combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    # Add a chunk of observations, NaN values are skipped
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype = float).ravel()
+        chunk = chunk[~np.isnan(chunk)]
+        if chunk.size == 0:
+            return self
+        mean = chunk.mean()
+        self._combine(chunk.size, mean, np.sum((chunk - mean) ** 2))
+        return self
+
+    # Merge another accumulator (e.g. computed on a different worker)
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    # Sample variance (ddof = 1)
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state["count"], state["mean"], state["m2"])
+
+# Two sample Welch t-test fed chunk by chunk, in constant memory
+class WelchTTestAccumulator:
+
+    def __init__(self):
+        self.groups = (RunningMoments(), RunningMoments())
+
+    # Add a chunk of observations to group 0 or group 1
+    def update(self, group, chunk):
+        self.groups[group].update(chunk)
+        return self
+
+    def merge(self, other):
+        for mine, theirs in zip(self.groups, other.groups):
+            mine.merge(theirs)
+        return self
+
+    # Welch t statistic, Welch-Satterthwaite degrees of freedom and p-value
+    def result(self, alternative = "two-sided"):
+        g1, g2 = self.groups
+        if g1.count < 2 or g2.count < 2:
+            return np.nan, np.nan, np.nan
+        se1, se2 = g1.variance / g1.count, g2.variance / g2.count
+        se = np.sqrt(se1 + se2)
+        t_stat = (g1.mean - g2.mean) / se
+        df = (se1 + se2) ** 2 / (se1 ** 2 / (g1.count - 1) + se2 ** 2 / (g2.count - 1))
+        return t_stat, df, t_p_value(t_stat, df, alternative)
+
+    # Small serializable state, so a long stream can be checkpointed and resumed
+    def to_dict(self):
+        return {"groups": [group.to_dict() for group in self.groups]}
+
+    @classmethod
+    def from_dict(cls, state):
+        accumulator = cls()
+        accumulator.groups = tuple(RunningMoments.from_dict(group) for group in state["groups"])
+        return accumulator
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(0)
+
+    # Streaming two sample t-test
+    print("\nStreaming two sample t-test:\nCompare sample means of two groups arriving in chunks")
+
+    # Stream 100 chunks of gaussian observations for each group
+    accumulator = WelchTTestAccumulator()
+    for chunk in range(100):
+        accumulator.update(0, np.random.normal(loc = 50, scale = 5, size = 1000))
+        accumulator.update(1, np.random.normal(loc = 50.1, scale = 8, size = 700))
+
+    t_stat, df, p_value = accumulator.result()
+    print(f"\nWelch t-statistic = {t_stat:.4f}")
+    print(f"Degrees of freedom = {df:.1f}")
+    print(f"p-value = {p_value:.4f}")
+
+    # Compare with the library on the samples held in memory
+    from scipy.stats import ttest_ind
+    np.random.seed(0)
+    sample1, sample2 = [], []
+    for chunk in range(100):
+        sample1.append(np.random.normal(loc = 50, scale = 5, size = 1000))
+        sample2.append(np.random.normal(loc = 50.1, scale = 8, size = 700))
+    t_stat_scipy, p_value_scipy = ttest_ind(np.concatenate(sample1), np.concatenate(sample2), equal_var = False)
+    print(f"\nUsing SciPy library:")
+    print(f"t-statistic = {t_stat_scipy:.4f}")
+    print(f"p-value = {p_value_scipy:.4f}")
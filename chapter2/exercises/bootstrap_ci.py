@@ -0,0 +1,125 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Hypotesis testing on multiple groups.
+
+# Import libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import norm
+
+# Statistics evaluated row by row on blocks of resamples, each argument has shape (B, n_i)
+def mean_statistic(sample):
+    return sample.mean(axis = -1)
+
+def variance_ratio(sample1, sample2):
+    return sample1.var(axis = -1, ddof = 1) / sample2.var(axis = -1, ddof = 1)
+
+# F statistic of the one-way ANOVA, as in f_anova.py but for any number of groups
+def anova_f_statistic(*groups):
+    sizes = np.array([group.shape[-1] for group in groups])
+    means = np.stack([group.mean(axis = -1) for group in groups])
+    overall_mean = np.tensordot(sizes, means, axes = 1) / sizes.sum()
+    ssb = np.tensordot(sizes, (means - overall_mean) ** 2, axes = 1)
+    ssw = sum(((group - mean[..., None]) ** 2).sum(axis = -1) for group, mean in zip(groups, means))
+    return (ssb / (len(groups) - 1)) / (ssw / (sizes.sum() - len(groups)))
+
+# Data and statistic shared with the worker processes (sent once per worker)
+_samples, _statistic = None, None
+
+def _init_worker(samples, statistic):
+    global _samples, _statistic
+    _samples, _statistic = samples, statistic
+
+# Statistic on one chunk of resamples, every group resampled with replacement independently
+def _bootstrap_chunk(args):
+    seed, n_resamples = args
+    rng = np.random.default_rng(seed)
+    resampled = [sample[rng.integers(0, sample.size, size = (n_resamples, sample.size))] for sample in _samples]
+    return _statistic(*resampled)
+
+# Leave-one-out statistics of every group (the other groups kept whole), in chunks of rows
+def _jackknife(samples, statistic, max_elements):
+    values = []
+    for j, sample in enumerate(samples):
+        n = sample.size
+        keep = np.arange(n - 1)
+        theta = np.empty(n)
+        rows = max(1, max_elements // max(n - 1, 1))
+        for start in range(0, n, rows):
+            left_out = np.arange(start, min(start + rows, n))
+            indices = keep + (keep >= left_out[:, None])
+            others = [np.broadcast_to(s, (left_out.size, s.size)) for s in samples]
+            others[j] = sample[indices]
+            theta[start:start + left_out.size] = statistic(*others)
+        values.append(theta)
+    return values
+
+# Bootstrap confidence interval (percentile or BCa) of a statistic of one or more samples
+# Resamples are generated in chunks of at most max_elements values instead of a full B x n matrix
+# Each chunk has its own SeedSequence child, so results are identical for any n_jobs
+# (with n_jobs > 1 the statistic must be a module-level function, so it can be sent to the workers)
+def bootstrap_ci(samples, statistic, n_resamples = 10000, confidence = 0.95, method = "percentile",
+                 max_elements = 2 ** 22, n_jobs = 1, seed = None):
+    if method not in ("percentile", "bca"):
+        raise ValueError("method must be 'percentile' or 'bca'")
+    samples = [np.asarray(sample, dtype = float).ravel() for sample in samples]
+    observed = float(statistic(*[sample[None, :] for sample in samples])[0])
+
+    # Fixed chunk layout with independent random streams
+    chunk = max(1, min(n_resamples, max_elements // sum(sample.size for sample in samples)))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    if n_jobs == 1:
+        _init_worker(samples, statistic)
+        boot = np.concatenate(list(map(_bootstrap_chunk, tasks)))
+    else:
+        with ProcessPoolExecutor(max_workers = n_jobs, initializer = _init_worker, initargs = (samples, statistic)) as executor:
+            boot = np.concatenate(list(executor.map(_bootstrap_chunk, tasks)))
+
+    # Percentile interval
+    tail = (1 - confidence) / 2
+    quantiles = np.array([tail, 1 - tail])
+
+    # BCa: bias correction from the bootstrap distribution, acceleration from the jackknife
+    if method == "bca":
+        z0 = norm.ppf(np.mean(boot < observed) + np.mean(boot == observed) / 2)
+        numerator, denominator = 0.0, 0.0
+        for theta in _jackknife(samples, statistic, max_elements):
+            n = theta.size
+            u = (n - 1) * (theta.mean() - theta)
+            numerator += np.sum(u ** 3) / n ** 3
+            denominator += np.sum(u ** 2) / n ** 2
+        acceleration = numerator / (6 * denominator ** 1.5) if denominator > 0 else 0.0
+        z = norm.ppf(quantiles)
+        quantiles = norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+
+    low, high = np.nanquantile(boot, quantiles)
+    return observed, (low, high), boot
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(42)
+
+    # Bootstrap confidence intervals
+    print("\nBootstrap confidence intervals:\nUncertainty of the mean, variance ratio and F statistic")
+
+    # Mean of 100 coin tosses (chapter 1)
+    observations = np.random.choice([0, 1], size = 100, p = [0.3, 0.7])
+    mean_observed, (low, high), _ = bootstrap_ci([observations], mean_statistic, method = "bca", seed = 1)
+    print(f"\nMean = {mean_observed:.4f}, 95% BCa interval = ({low:.4f}, {high:.4f})")
+
+    # Ratio of variances (f_test.py)
+    sample1 = np.random.normal(loc = 50, scale = 5, size = 100)
+    sample2 = np.random.normal(loc = 50, scale = 5, size = 100)
+    ratio, (low, high), _ = bootstrap_ci([sample1, sample2], variance_ratio, seed = 2)
+    print(f"var1 / var2 = {ratio:.4f}, 95% percentile interval = ({low:.4f}, {high:.4f})")
+
+    # F statistic and group means (f_anova.py)
+    data = [np.random.normal(loc = 5, scale = 1, size = 10) for group in range(3)]
+    F_stat, (low, high), _ = bootstrap_ci(data, anova_f_statistic, n_jobs = 2, seed = 3)
+    print(f"F ANOVA = {F_stat:.4f}, 95% percentile interval = ({low:.4f}, {high:.4f})")
+    for i, group in enumerate(data):
+        mean, (low, high), _ = bootstrap_ci([group], mean_statistic, method = "bca", seed = 4 + i)
+        print(f"mean{i + 1} = {mean:.4f}, 95% BCa interval = ({low:.4f}, {high:.4f})")
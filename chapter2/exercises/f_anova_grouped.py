@@ -0,0 +1,104 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Hypotesis testing on multiple groups.
+
+# Import libraries
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.stats import f
+
+# Per-group counts, sums and sums of squares of long-format data in a single pass
+# values has shape (N, ) or (N, p) (p response columns), labels are integers 0 .. n_groups - 1
+# Values are shifted by a constant before squaring, which avoids cancellation in sumsq - sum^2 / n
+def group_sums(values, labels, n_groups = None, shift = 0.0, chunk_rows = 2 ** 20):
+    values = np.asarray(values, dtype = float)
+    labels = np.asarray(labels, dtype = np.int64)
+    if labels.shape != values.shape[:1]:
+        raise ValueError("labels must have one entry per row of values")
+    if labels.size and labels.min() < 0:
+        raise ValueError("labels must be non-negative integers")
+    if n_groups is None:
+        n_groups = int(labels.max()) + 1 if labels.size else 0
+    columns = values.shape[1:]
+
+    counts = np.bincount(labels, minlength = n_groups)[:n_groups]
+    sums = np.zeros((n_groups, ) + columns)
+    sumsq = np.zeros((n_groups, ) + columns)
+    for start in range(0, labels.size, chunk_rows):
+        label_chunk = labels[start:start + chunk_rows]
+        shifted = values[start:start + chunk_rows] - shift
+        if shifted.ndim == 1:
+            sums += np.bincount(label_chunk, weights = shifted, minlength = n_groups)[:n_groups]
+            sumsq += np.bincount(label_chunk, weights = shifted * shifted, minlength = n_groups)[:n_groups]
+        else:
+            # Sparse group indicator (n_groups x rows), so all columns are reduced at once
+            indicator = csr_matrix((np.ones(label_chunk.size), (label_chunk, np.arange(label_chunk.size))),
+                                   shape = (n_groups, label_chunk.size))
+            sums += indicator @ shifted
+            sumsq += indicator @ (shifted * shifted)
+    return counts, sums, sumsq
+
+# F statistic and p-value from per-group counts, (shifted) sums and sums of squares
+def anova_from_sums(counts, sums, sumsq):
+    n_g = counts.reshape((-1, ) + (1, ) * (sums.ndim - 1))
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        means = sums / n_g
+    return anova_from_moments(counts, means, np.maximum(sumsq - sums * means, 0.0))
+
+# F statistic and p-value from per-group counts, means and sums of squared deviations from the group mean
+# Empty groups are ignored, so label sets with gaps are allowed
+def anova_from_moments(counts, means, m2):
+    present = counts > 0
+    counts, means, m2 = counts[present], means[present], m2[present]
+    n_total, k = counts.sum(), counts.size
+    df_between, df_within = k - 1, n_total - k
+    if df_between < 1 or df_within < 1:
+        raise ValueError("need at least two non-empty groups and more observations than groups")
+
+    # Broadcast counts over the response columns
+    n_g = counts.reshape((-1, ) + (1, ) * (means.ndim - 1))
+    overall_mean = np.sum(n_g * means, axis = 0) / n_total
+
+    # Variation between groups (SSB) and within groups (SSW)
+    ssb = np.sum(n_g * (means - overall_mean) ** 2, axis = 0)
+    ssw = np.sum(m2, axis = 0)
+
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        F_stat = (ssb / df_between) / (ssw / df_within)
+    p_value = f.sf(F_stat, df_between, df_within)
+    return F_stat, p_value, df_between, df_within
+
+# One-way ANOVA for any number of groups given as a value array plus integer group labels
+def anova_oneway_grouped(values, labels, n_groups = None, chunk_rows = 2 ** 20):
+    values = np.asarray(values, dtype = float)
+    shift = values[0] if values.shape[0] else 0.0
+    counts, sums, sumsq = group_sums(values, labels, n_groups, shift, chunk_rows)
+    return anova_from_sums(counts, sums, sumsq)
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Fisher ANOVA on long-format data
+    print("\nFisher ANOVA:\nCompare many groups given as values plus group labels")
+
+    # 1000 groups of different sizes, 5 response columns, the last one with shifted group means
+    n_groups, n_rows, n_columns = 1000, 200000, 5
+    labels = np.random.randint(0, n_groups, size = n_rows)
+    values = np.random.normal(loc = 5, scale = 1, size = (n_rows, n_columns))
+    values[:, -1] += 0.1 * (labels % 3)
+
+    F_stat, p_value, df_between, df_within = anova_oneway_grouped(values, labels)
+    print(f"\nDegrees of freedom: between = {df_between}, within = {df_within}")
+    print("F ANOVA (grouped): ", np.round(F_stat, 4))
+    print("p-value (grouped): ", np.round(p_value, 4))
+
+    # Compare with the library on the first column
+    from scipy.stats import f_oneway
+    order = np.argsort(labels, kind = "stable")
+    groups = np.split(values[order, 0], np.cumsum(np.bincount(labels, minlength = n_groups))[:-1])
+    F_stat_scipy, p_value_scipy = f_oneway(*groups)
+    print("\nF ANOVA (scipy, first column): ", F_stat_scipy)
+    print("p-value (scipy, first column): ", p_value_scipy)
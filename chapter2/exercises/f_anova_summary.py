@@ -0,0 +1,146 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Hypotesis testing on multiple groups.
+
+# Import libraries
+import numpy as np
+from functools import reduce
+from f_anova_grouped import group_sums, anova_from_moments
+
+# Per-group sufficient statistics (count, mean, sum of squared deviations M2) of a one-way ANOVA
+# Summaries built on separate chunks or shards can be merged in any order (Chan et al. update, as in
+# RunningMoments of chapter 1), then finalized into F and p-value
+# Means and M2 are never formed from raw sums of squares, so values with a large mean keep full precision
+class AnovaSummary:
+
+    def __init__(self, n_groups = 0, n_columns = None):
+        columns = () if n_columns is None else (n_columns, )
+        self.counts = np.zeros(n_groups, dtype = np.int64)
+        self.means = np.zeros((n_groups, ) + columns)
+        self.m2 = np.zeros((n_groups, ) + columns)
+
+    # Enlarge the tables when a chunk brings new group labels (empty tables also adopt the column layout)
+    def _grow(self, n_groups, columns):
+        if self.counts.size == 0 and self.means.shape[1:] != columns:
+            self.means = np.zeros((0, ) + columns)
+            self.m2 = np.zeros((0, ) + columns)
+        extra = n_groups - self.counts.size
+        if extra > 0:
+            self.counts = np.concatenate([self.counts, np.zeros(extra, dtype = np.int64)])
+            self.means = np.concatenate([self.means, np.zeros((extra, ) + self.means.shape[1:])])
+            self.m2 = np.concatenate([self.m2, np.zeros((extra, ) + self.m2.shape[1:])])
+
+    # Merge per-group (count, mean, M2) of a chunk into the first n groups
+    def _combine(self, counts, means, m2):
+        n = counts.size
+        total = self.counts[:n] + counts
+        weight = (counts / np.maximum(total, 1)).reshape((-1, ) + (1, ) * (means.ndim - 1))
+        delta = means - self.means[:n]
+        self.m2[:n] += m2 + delta ** 2 * weight * self.counts[:n].reshape(weight.shape)
+        self.means[:n] += delta * weight
+        self.counts[:n] = total
+
+    # Add a chunk of long-format data (values of shape (N, ) or (N, p), integer labels)
+    # Two passes over the chunk: group means, then squared deviations from them
+    def update(self, values, labels):
+        values = np.asarray(values, dtype = float)
+        labels = np.asarray(labels, dtype = np.int64)
+        n_groups = max(self.counts.size, int(labels.max()) + 1 if labels.size else 0)
+        counts, sums, _ = group_sums(values, labels, n_groups, values[0] if labels.size else 0.0)
+        n_g = np.maximum(counts, 1).reshape((-1, ) + (1, ) * (sums.ndim - 1))
+        means = (values[0] if labels.size else 0.0) + sums / n_g
+        _, deviations, m2 = group_sums(values - means[labels], labels, n_groups)
+        self._grow(n_groups, sums.shape[1:])
+        self._combine(counts, means, m2 - deviations ** 2 / n_g)
+        return self
+
+    # Associative merge with another summary
+    def merge(self, other):
+        self._grow(other.counts.size, other.means.shape[1:])
+        self._combine(other.counts, other.means, other.m2)
+        return self
+
+    # F statistic, p-value and degrees of freedom
+    def finalize(self):
+        return anova_from_moments(self.counts, self.means, self.m2)
+
+    # Plain dictionary / file representation, to ship summaries between nodes
+    def to_dict(self):
+        return {"counts": self.counts.tolist(), "means": self.means.tolist(), "m2": self.m2.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        summary = cls()
+        summary.counts = np.asarray(state["counts"], dtype = np.int64)
+        summary.means = np.asarray(state["means"], dtype = float)
+        summary.m2 = np.asarray(state["m2"], dtype = float)
+        return summary
+
+    def save(self, path):
+        np.savez(path, counts = self.counts, means = self.means, m2 = self.m2)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as state:
+            return cls.from_dict({key: state[key] for key in ("counts", "means", "m2")})
+
+# Pairwise tree reduction of a list of summaries
+def tree_reduce(summaries):
+    summaries = list(summaries)
+    if not summaries:
+        raise ValueError("nothing to reduce")
+    while len(summaries) > 1:
+        summaries = [reduce(AnovaSummary.merge, summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+    return summaries[0]
+
+# One-way ANOVA over a CSV or Parquet file larger than memory, read chunk by chunk
+# Needs pandas (CSV) or pyarrow (Parquet), imported only when used
+def anova_from_file(path, value_columns, label_column, chunksize = 1000000):
+    single = isinstance(value_columns, str)
+    value_columns = [value_columns] if single else list(value_columns)
+    summary = AnovaSummary(n_columns = None if single else len(value_columns))
+    if str(path).endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size = chunksize, columns = value_columns + [label_column]))
+    else:
+        import pandas as pd
+        batches = pd.read_csv(path, usecols = value_columns + [label_column], chunksize = chunksize)
+    for batch in batches:
+        values = batch[value_columns].to_numpy(dtype = float)
+        summary.update(values[:, 0] if single else values, batch[label_column].to_numpy())
+    return summary.finalize()
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Fisher ANOVA from mergeable summaries
+    print("\nFisher ANOVA:\nMerge per-shard summaries instead of concatenating the data")
+
+    # Three groups as in f_anova.py, split into 8 shards
+    values = np.random.normal(loc = 5, scale = 1, size = 30)
+    labels = np.repeat([0, 1, 2], 10)
+    shards = np.array_split(np.random.permutation(30), 8)
+    summaries = [AnovaSummary().update(values[shard], labels[shard]) for shard in shards]
+
+    # Ship one summary as a dictionary, then merge all of them
+    summaries[0] = AnovaSummary.from_dict(summaries[0].to_dict())
+    F_stat, p_value, df_between, df_within = tree_reduce(summaries).finalize()
+    print("\nF ANOVA (merged): ", F_stat)
+    print("p-value (merged): ", p_value)
+
+    # Compare with precompiled libraries
+    from scipy.stats import f_oneway
+    F_stat_scipy, p_value_scipy = f_oneway(values[:10], values[10:20], values[20:])
+    print("\nF ANOVA (scipy): ", F_stat_scipy)
+    print("p-value (scipy): ", p_value_scipy)
+
+    # Values with a large mean (1e8 plus unit noise), 5 groups in 16 shards
+    values = 1e8 + np.random.normal(size = 5000) + 0.1 * np.repeat(np.arange(5), 1000)
+    labels = np.repeat(np.arange(5), 1000)
+    shards = np.array_split(np.random.permutation(5000), 16)
+    F_stat, p_value, _, _ = tree_reduce(AnovaSummary().update(values[shard], labels[shard]) for shard in shards).finalize()
+    F_stat_scipy, p_value_scipy = f_oneway(*np.split(values, 5))
+    print(f"\nLarge mean: F (merged) = {F_stat:.6f}, (scipy) = {F_stat_scipy:.6f}, p-value (merged) = {p_value:.3e}, (scipy) = {p_value_scipy:.3e}")
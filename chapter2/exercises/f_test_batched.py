@@ -0,0 +1,91 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Hypotesis testing on multiple groups.
+
+# Import libraries
+import numpy as np
+from scipy.stats import f, chi2
+
+# One-way ANOVA F statistic on the columns of k groups of shape (n_i, p)
+def _anova_columns(groups, sizes):
+    means = np.stack([group.mean(axis = 0) for group in groups])
+    overall_mean = sizes @ means / sizes.sum()
+    ssb = sizes @ (means - overall_mean) ** 2
+    ssw = sum(((group - mean) ** 2).sum(axis = 0) for group, mean in zip(groups, means))
+    df_between, df_within = len(groups) - 1, sizes.sum() - len(groups)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        stat = (ssb / df_between) / (ssw / df_within)
+    return stat, f.sf(stat, df_between, df_within)
+
+# Levene test on absolute deviations from a centre (mean: Levene, median: Brown-Forsythe)
+def _levene_columns(groups, sizes, centers):
+    deviations = [np.abs(group - center) for group, center in zip(groups, centers)]
+    return _anova_columns(deviations, sizes)
+
+# Variance-equality tests for every column of two or more (n_i, p) samples
+# Group means and variances are computed once and shared by the F, Bartlett and Levene tests
+# Returns a dictionary test name -> (statistics, p-values), one value per column
+def variance_tests_batched(*samples):
+    groups = [np.asarray(sample, dtype = float) for sample in samples]
+    groups = [group[:, None] if group.ndim == 1 else group for group in groups]
+    k = len(groups)
+    if k < 2:
+        raise ValueError("need at least two samples")
+    if len({group.shape[1] for group in groups}) != 1:
+        raise ValueError("all samples must have the same number of columns")
+    sizes = np.array([group.shape[0] for group in groups], dtype = float)
+    if np.any(sizes < 2):
+        raise ValueError("every sample needs at least two observations")
+
+    # Shared moments
+    means = [group.mean(axis = 0) for group in groups]
+    variances = np.stack([group.var(axis = 0, ddof = 1) for group in groups])
+    results = {}
+
+    # F test (two samples), two-sided p-value of var1 / var2
+    if k == 2:
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            F_stat = variances[0] / variances[1]
+        df1, df2 = sizes - 1
+        results["f"] = (F_stat, np.minimum(1.0, 2 * np.minimum(f.cdf(F_stat, df1, df2), f.sf(F_stat, df1, df2))))
+
+    # Bartlett's test (likelihood-ratio test)
+    df_within = sizes.sum() - k
+    pooled = (sizes - 1) @ variances / df_within
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        numerator = df_within * np.log(pooled) - (sizes - 1) @ np.log(variances)
+    correction = 1 + (np.sum(1 / (sizes - 1)) - 1 / df_within) / (3 * (k - 1))
+    bartlett_stat = numerator / correction
+    results["bartlett"] = (bartlett_stat, chi2.sf(bartlett_stat, k - 1))
+
+    # Levene's test (centred on the means) and Brown-Forsythe (centred on the medians)
+    results["levene"] = _levene_columns(groups, sizes, means)
+    results["brown_forsythe"] = _levene_columns(groups, sizes, [np.median(group, axis = 0) for group in groups])
+    return results
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(42)
+
+    # Batched variance tests
+    print("\nBatched variance tests:\nCompare sample variances of many features at once")
+
+    # 1000 features with 100 observations per group, the last 100 features with a larger spread in sample 2
+    sample1 = np.random.normal(loc = 50, scale = 5, size = (100, 1000))
+    sample2 = np.random.normal(loc = 50, scale = 5, size = (100, 1000))
+    sample2[:, -100:] *= 1.5
+
+    results = variance_tests_batched(sample1, sample2)
+    alpha = 0.05
+    for name, (stat, p_value) in results.items():
+        print(f"\n{name}: equal-variance features rejected = {np.mean(p_value[:-100] < alpha):.3f}, "
+              f"unequal-variance features rejected = {np.mean(p_value[-100:] < alpha):.3f}")
+
+    # Compare with precompiled libraries on the first feature
+    from scipy.stats import bartlett, levene
+    print("\nFirst feature:")
+    print(f"Bartlett (batched) = {results['bartlett'][0][0]:.4f}, (scipy) = {bartlett(sample1[:, 0], sample2[:, 0])[0]:.4f}")
+    print(f"Levene (batched) = {results['levene'][0][0]:.4f}, (scipy) = {levene(sample1[:, 0], sample2[:, 0], center = 'mean')[0]:.4f}")
+    print(f"Brown-Forsythe (batched) = {results['brown_forsythe'][0][0]:.4f}, (scipy) = {levene(sample1[:, 0], sample2[:, 0])[0]:.4f}")
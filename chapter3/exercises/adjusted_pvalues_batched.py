@@ -0,0 +1,102 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 3. Multiple hypothesis testing.
+
+# Import libraries
+import numpy as np
+from scipy.special import digamma
+
+methods = ("bonferroni", "holm", "hochberg", "bh", "by", "storey")
+
+# Multiplier of the i-th smallest p-value (ranks are 1-based) for each step-wise method
+def _rank_factor(method, ranks, m):
+    if method in ("holm", "hochberg"):
+        return m - ranks + 1.0
+    return m / ranks
+
+# Estimate of the proportion of true null hypotheses, counted chunk by chunk
+# (Storey, Taylor & Siegmund 2004, the + 1 keeps the estimate positive for small families)
+def storey_pi0(p_values, lambda_ = 0.5, chunk_size = 2 ** 24):
+    m = p_values.shape[0]
+    above = sum(int(np.count_nonzero(p_values[s:s + chunk_size] > lambda_)) for s in range(0, m, chunk_size))
+    return min(1.0, (above + 1) / (m * (1 - lambda_)))
+
+# Adjusted p-values for Bonferroni, Holm, Hochberg, Benjamini-Hochberg, Benjamini-Yekutieli and Storey q-values
+# Works in the dtype of the input (float32 or float64) with a single argsort and one working copy
+# out can be preallocated (or be p_values itself for an in-place update), chunk_size bounds every other temporary,
+# so memory-mapped inputs and outputs are processed piece by piece
+# Missing (NaN or infinite) p-values stay NaN and the others are adjusted with m = number of finite p-values,
+# as in R's p.adjust
+def adjust_pvalues(p_values, method = "bh", out = None, chunk_size = 2 ** 24, lambda_ = 0.5):
+    if method not in methods:
+        raise ValueError(f"method must be one of {methods}")
+    # float32 and float64 arrays (memory-mapped ones too) are used as they are, anything else is cast to float64
+    if not (isinstance(p_values, np.ndarray) and p_values.dtype in (np.float32, np.float64)):
+        p_values = np.asarray(p_values, dtype = np.float64)
+    if p_values.ndim != 1:
+        raise ValueError("p_values must be a 1-D array")
+    dtype = np.dtype(p_values.dtype)
+    m = p_values.shape[0]
+    if out is None:
+        out = np.empty(m, dtype = dtype)
+
+    # Adjust the finite p-values on their own (this copies them, inputs without missing values are not copied)
+    finite = np.isfinite(p_values)
+    if not finite.all():
+        out[~finite] = np.nan
+        if finite.any():
+            out[finite] = adjust_pvalues(p_values[finite], method, chunk_size = chunk_size, lambda_ = lambda_)
+        return out
+
+    # Bonferroni needs no sorting
+    if method == "bonferroni":
+        for s in range(0, m, chunk_size):
+            np.minimum(p_values[s:s + chunk_size] * dtype.type(m), 1, out = out[s:s + chunk_size])
+        return out
+
+    # Sort once, then scale the sorted p-values in place
+    order = np.argsort(p_values, kind = "stable")
+    work = np.empty(m, dtype = dtype)
+    for s in range(0, m, chunk_size):
+        ranks = np.arange(s + 1, min(s + chunk_size, m) + 1, dtype = dtype)
+        np.multiply(p_values[order[s:s + chunk_size]], _rank_factor(method, ranks, dtype.type(m)), out = work[s:s + chunk_size])
+    if method == "by":
+        # Harmonic number 1 + 1/2 + ... + 1/m without building the series
+        work *= dtype.type(digamma(m + 1) + np.euler_gamma)
+    if method == "storey":
+        work *= dtype.type(storey_pi0(p_values, lambda_, chunk_size))
+
+    # Monotonicity: step-down (Holm) takes a running maximum, step-up methods a running minimum from the end
+    if method == "holm":
+        np.maximum.accumulate(work, out = work)
+    else:
+        reverse = work[::-1]
+        np.minimum.accumulate(reverse, out = reverse)
+    np.minimum(work, 1, out = work)
+
+    # Scatter back to the original order
+    for s in range(0, m, chunk_size):
+        out[order[s:s + chunk_size]] = work[s:s + chunk_size]
+    return out
+
+
+if __name__ == "__main__":
+
+    # List of p-values, as in adjusted_pvalues.py
+    p_values = np.array([0.01, 0.02, 0.03, 0.04, 0.10])
+    np.set_printoptions(precision = 3)
+    print("\nOriginal p-values:", p_values)
+    for method in methods:
+        print(f"{method} corrected:", adjust_pvalues(p_values, method))
+
+    # A missing p-value stays missing and does not count towards m
+    print("\nWith a missing p-value:", adjust_pvalues(np.append(p_values, np.nan), "bh"))
+
+    # Ten million p-values in single precision, 5% of them from true effects
+    np.random.seed(42)
+    m = 10 ** 7
+    p_values = np.random.random(m).astype(np.float32)
+    p_values[:m // 20] *= np.float32(1e-4)
+    out = np.empty(m, dtype = np.float32)
+    adjust_pvalues(p_values, "bh", out = out)
+    print(f"\nBH discoveries among {m} p-values: {np.count_nonzero(out < 0.05)} (true effects: {m // 20})")
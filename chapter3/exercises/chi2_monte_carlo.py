@@ -0,0 +1,96 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Normality and multiple groups.
+
+# Import libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import beta
+
+# Chi-square (Pearson) or G statistic of every row of an (R, k) table of counts
+def gof_statistic(observed, expected, statistic = "pearson"):
+    if statistic == "pearson":
+        return np.sum((observed - expected) ** 2 / expected, axis = -1)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        terms = np.where(observed > 0, observed * np.log(observed / expected), 0.0)
+    return 2 * np.sum(terms, axis = -1)
+
+# Number of simulated tables (under H0) at least as extreme as the observed statistic, for one block
+def _exceedances_block(args):
+    seed, n_tables, n, probabilities, observed_stat, statistic = args
+    rng = np.random.default_rng(seed)
+    tables = rng.multinomial(n, probabilities, size = n_tables)
+    simulated = gof_statistic(tables, n * probabilities, statistic)
+    return int(np.count_nonzero(simulated >= observed_stat * (1 - 1e-12)))
+
+# Clopper-Pearson interval of a Monte Carlo p-value from k exceedances in n draws
+# (same as in chapter1/exercises/permutation_test.py, each chapter stays self-contained)
+def p_value_interval(k, n, confidence = 0.99):
+    tail = (1 - confidence) / 2
+    low = beta.ppf(tail, k, n - k + 1) if k > 0 else 0.0
+    high = beta.ppf(1 - tail, k + 1, n - k) if k < n else 1.0
+    return low, high
+
+# Monte Carlo exact p-value of the chi-square goodness-of-fit test, reliable for small expected counts
+# Null tables are drawn from the multinomial in blocks, spread over n_jobs processes with independent seeds
+# After every round of blocks the running p-value is checked, and sampling stops once its interval clears alpha
+def chi2_monte_carlo(observed, probabilities = None, n_tables = 10 ** 6, statistic = "pearson", alpha = 0.05,
+                     confidence = 0.99, early_stopping = True, block_size = 50000, blocks_per_check = 8,
+                     n_jobs = 1, seed = None):
+    observed = np.asarray(observed, dtype = np.int64)
+    k, n = observed.size, int(observed.sum())
+    probabilities = np.full(k, 1 / k) if probabilities is None else np.asarray(probabilities, dtype = float)
+    probabilities = probabilities / probabilities.sum()
+    observed_stat = float(gof_statistic(observed, n * probabilities, statistic))
+
+    # Fixed block layout and seeds, so results do not depend on n_jobs
+    sizes = [min(block_size, n_tables - start) for start in range(0, n_tables, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, n, probabilities, observed_stat, statistic) for s, size in zip(seeds, sizes)]
+
+    executor = ProcessPoolExecutor(max_workers = n_jobs) if n_jobs != 1 else None
+    run = executor.map if executor is not None else map
+    count, done = 0, 0
+    try:
+        for start in range(0, len(tasks), blocks_per_check):
+            batch = tasks[start:start + blocks_per_check]
+            count += sum(run(_exceedances_block, batch))
+            done += sum(task[1] for task in batch)
+            if early_stopping:
+                low, high = p_value_interval(count, done, confidence)
+                if high < alpha or low > alpha:
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    p_value = (count + 1) / (done + 1)
+    return observed_stat, p_value, done, p_value_interval(count, done, confidence)
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Compare expected vs observed choices with few participants
+    print("\nCompare expected vs observed choices:\nExact p-value by simulation of the null")
+
+    # Human-biased choices as in random_numbers_chi2.py, only 10 people (3 expected counts per number)
+    frequencies = [1, 1, 2, 1, 2, 1, 2, 1, 2, 1]
+    human_bias = np.array(frequencies) / sum(frequencies)
+    n_people = 10
+    human_choices = np.random.choice(range(10), size = n_people * 3, p = human_bias)
+    human_freq = np.bincount(human_choices, minlength = 10)
+
+    chi2_stat, p_value, n_used, interval = chi2_monte_carlo(human_freq, n_jobs = 2, seed = 1, early_stopping = False)
+    print(f"\nChi-Square Statistic: {chi2_stat:.2f}")
+    print(f"P-value (Monte Carlo, {n_used} tables): {p_value:.4f}, 99% interval ({interval[0]:.4f}, {interval[1]:.4f})")
+
+    # Compare with the asymptotic p-value
+    from scipy.stats import chisquare
+    print(f"P-value (asymptotic): {chisquare(human_freq).pvalue:.4f}")
+
+    # With early stopping only as many tables as needed are drawn
+    chi2_stat, p_value, n_used, interval = chi2_monte_carlo(human_freq, seed = 1)
+    print(f"\nP-value with early stopping: {p_value:.4f} after {n_used} tables")
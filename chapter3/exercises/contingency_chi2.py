@@ -0,0 +1,117 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 2. Normality and multiple groups.
+
+# Import libraries
+import numpy as np
+from scipy.sparse import coo_matrix, issparse
+from scipy.stats import chi2
+
+# Map arbitrary category labels to integer codes 0 .. k - 1 (one sort), returns the codes and the labels
+def encode_categories(values):
+    labels, codes = np.unique(np.asarray(values), return_inverse = True)
+    return codes.ravel(), labels
+
+# Frequencies of integer categories 0 .. n_categories - 1 in a single pass
+# (replaces [np.sum(choices == i) for i in range(10)], which scans the data once per category)
+def count_categories(codes, n_categories = None):
+    codes = np.asarray(codes, dtype = np.int64).ravel()
+    counts = np.bincount(codes, minlength = n_categories or 0)
+    if n_categories is not None and counts.size > n_categories:
+        raise ValueError("codes must be smaller than n_categories")
+    return counts
+
+# Two-way contingency table of paired integer codes in a single pass
+# sparse = True builds a CSR table (duplicates summed), suited to thousands of levels on each side
+def contingency_table(row_codes, col_codes, shape = None, sparse = True):
+    row_codes = np.asarray(row_codes, dtype = np.int64).ravel()
+    col_codes = np.asarray(col_codes, dtype = np.int64).ravel()
+    if shape is None:
+        shape = (int(row_codes.max()) + 1, int(col_codes.max()) + 1)
+    if sparse:
+        return coo_matrix((np.ones(row_codes.size, dtype = np.int64), (row_codes, col_codes)), shape = shape).tocsr()
+    return np.bincount(row_codes * shape[1] + col_codes, minlength = shape[0] * shape[1]).reshape(shape)
+
+# Chi-square goodness of fit of observed counts (uniform expectation by default)
+def chi2_goodness_of_fit(observed, expected = None, ddof = 0):
+    observed = np.asarray(observed, dtype = float)
+    if expected is None:
+        expected = np.full(observed.shape, observed.sum() / observed.size)
+    chi2_stat = np.sum((observed - np.asarray(expected, dtype = float)) ** 2 / expected)
+    df = observed.size - 1 - ddof
+    return chi2_stat, chi2.sf(chi2_stat, df), df
+
+# Pearson chi-square or G-test of independence on a dense or sparse table
+# Only non-zero cells are visited: sum (O - E)^2 / E = sum O^2 / E - N, and empty cells add nothing to G
+# Rows and columns with zero total are left out of the degrees of freedom
+# G is divided by Williams' correction q = 1 + (N sum 1/R - 1)(N sum 1/C - 1) / (6 N df), without it G overshoots
+# the chi-square reference when many expected counts are small (thousands of cells with E around 10 already give
+# q of a few percent, enough to reject a true null when df is large)
+def chi2_independence(table, statistic = "pearson", williams = True):
+    if statistic not in ("pearson", "g"):
+        raise ValueError("statistic must be 'pearson' or 'g'")
+    if issparse(table):
+        table = table.tocoo()
+        table.sum_duplicates()
+        observed, rows, cols = table.data.astype(float), table.row, table.col
+        row_totals = np.asarray(table.sum(axis = 1)).ravel().astype(float)
+        col_totals = np.asarray(table.sum(axis = 0)).ravel().astype(float)
+    else:
+        table = np.asarray(table, dtype = float)
+        rows, cols = np.nonzero(table)
+        observed = table[rows, cols]
+        row_totals, col_totals = table.sum(axis = 1), table.sum(axis = 0)
+    observed_mask = observed > 0
+    observed, rows, cols = observed[observed_mask], rows[observed_mask], cols[observed_mask]
+    total = observed.sum()
+
+    # Expected counts of the non-zero cells only
+    expected = row_totals[rows] * col_totals[cols] / total
+    if statistic == "pearson":
+        stat = max(np.sum(observed ** 2 / expected) - total, 0.0)
+    else:
+        stat = 2 * np.sum(observed * np.log(observed / expected))
+    row_totals, col_totals = row_totals[row_totals > 0], col_totals[col_totals > 0]
+    df = (row_totals.size - 1) * (col_totals.size - 1)
+    if statistic == "g" and williams and df > 0:
+        stat /= 1 + (total * np.sum(1 / row_totals) - 1) * (total * np.sum(1 / col_totals) - 1) / (6 * total * df)
+    return stat, chi2.sf(stat, df), df
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Compare expected vs observed choices
+    print("\nCompare expected vs observed choices")
+
+    # Human-biased choices of numbers 0-9 from random_numbers_chi2.py, a million people picking 3 numbers
+    frequencies = np.array([1, 1, 2, 1, 2, 1, 2, 1, 2, 1])
+    human_bias = frequencies / frequencies.sum()
+    n_people = 10 ** 6
+    human_choices = np.random.choice(10, size = n_people * 3, p = human_bias)
+
+    # Count frequencies in a single pass and test against uniform
+    human_freq = count_categories(human_choices, 10)
+    chi2_stat, p_value, df = chi2_goodness_of_fit(human_freq)
+    print(f"\nChi-Square Statistic: {chi2_stat:.2f}, p-value: {p_value:.4f}")
+
+    # Independence between 2000 regions and 500 products (sparse table, never densified)
+    # About 10 expected counts per cell: the uncorrected G rejects this true null, Williams' correction fixes it
+    regions = np.random.randint(0, 2000, size = 10 ** 7)
+    products = np.random.randint(0, 500, size = 10 ** 7)
+    table = contingency_table(regions, products)
+    for statistic in ("pearson", "g"):
+        stat, p_value, df = chi2_independence(table, statistic)
+        print(f"{statistic} independence test: statistic = {stat:.2f}, df = {df}, p-value = {p_value:.4f}")
+    stat, p_value, df = chi2_independence(table, "g", williams = False)
+    print(f"g independence test without Williams' correction: statistic = {stat:.2f}, p-value = {p_value:.4f}")
+
+    # Compare with the library on a small dense table
+    from scipy.stats import chi2_contingency
+    small = contingency_table(regions[:1000] % 3, products[:1000] % 4, sparse = False)
+    print("\nSmall table (manual): ", chi2_independence(small)[:2])
+    print("Small table (scipy): ", chi2_contingency(small, correction = False)[:2])
+    print("\nSmall table G, uncorrected (manual): ", chi2_independence(small, "g", williams = False)[:2])
+    print("Small table G, uncorrected (scipy): ", chi2_contingency(small, correction = False, lambda_ = "log-likelihood")[:2])
@@ -0,0 +1,148 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Chapter 3. Multiple hypothesis testing.
+
+# Import libraries
+import json
+import math
+import numpy as np
+
+# Default spending sequence of LORD (Javanmard & Montanari, 2018), sums to about one
+def lord_gamma(j):
+    j = max(j, 1)
+    return 0.07720838 * math.log(max(j, 2)) / (j * math.exp(math.sqrt(math.log(j))))
+
+# Shared checkpointing and replay of online FDR controllers
+# The state is a handful of numbers, so each controller can be stored and resumed between p-values
+class OnlineFDRController:
+
+    state_fields = ()
+
+    def to_dict(self):
+        return {"type": type(self).__name__} | {name: getattr(self, name) for name in self.state_fields}
+
+    @classmethod
+    def from_dict(cls, state):
+        controller = cls.__new__(cls)
+        for name in cls.state_fields:
+            setattr(controller, name, state[name])
+        return controller
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    # Replay a stored stream of p-values (benchmark / batch mode)
+    # Returns the decisions and the test level used for every p-value
+    def replay(self, p_values):
+        p_values = np.asarray(p_values, dtype = float).tolist()
+        levels = np.empty(len(p_values))
+        decisions = np.empty(len(p_values), dtype = bool)
+        test, level = self.test, self.next_level
+        for i, p in enumerate(p_values):
+            levels[i] = level()
+            decisions[i] = test(p)
+        return decisions, levels
+
+# LORD 3: the test level only depends on the wealth at the last discovery and the time since then,
+# so each new p-value costs O(1) work
+class LordController(OnlineFDRController):
+
+    state_fields = ("alpha", "w0", "t", "last_rejection", "wealth", "wealth_at_rejection")
+
+    def __init__(self, alpha = 0.05, w0 = None):
+        self.alpha = alpha
+        self.w0 = alpha / 2 if w0 is None else w0
+        if not 0 < self.w0 <= alpha:
+            raise ValueError("initial wealth must lie in (0, alpha]")
+        self.t = 0
+        self.last_rejection = 0
+        self.wealth = self.w0
+        self.wealth_at_rejection = self.w0
+
+    # Level for the next p-value
+    def next_level(self):
+        return lord_gamma(self.t + 1 - self.last_rejection) * self.wealth_at_rejection
+
+    # Test one incoming p-value, returns True for a discovery
+    def test(self, p_value):
+        level = self.next_level()
+        self.t += 1
+        self.wealth -= level
+        rejected = p_value <= level
+        if rejected:
+            # Every discovery earns back alpha - w0
+            self.wealth += self.alpha - self.w0
+            self.last_rejection = self.t
+            self.wealth_at_rejection = self.wealth
+        return rejected
+
+# Alpha-investing (Foster & Stine, 2008): pay alpha_t / (1 - alpha_t) for every non-discovery,
+# earn the payout for every discovery
+class AlphaInvestingController(OnlineFDRController):
+
+    state_fields = ("alpha", "payout", "t", "last_rejection", "wealth")
+
+    def __init__(self, alpha = 0.05, w0 = None, payout = None):
+        self.alpha = alpha
+        self.payout = alpha if payout is None else payout
+        self.t = 0
+        self.last_rejection = 0
+        self.wealth = alpha * (1 - alpha) if w0 is None else w0
+
+    # Spend the wealth evenly over the tests since the last discovery
+    def next_level(self):
+        bet = self.wealth / (1 + self.t + 1 - self.last_rejection)
+        return bet / (1 + bet)
+
+    def test(self, p_value):
+        level = self.next_level()
+        self.t += 1
+        rejected = p_value <= level
+        if rejected:
+            self.wealth += self.payout
+            self.last_rejection = self.t
+        else:
+            self.wealth -= level / (1 - level)
+        return rejected
+
+controllers = {"LordController": LordController, "AlphaInvestingController": AlphaInvestingController}
+
+# Restore any controller from a checkpoint file
+def load_controller(path):
+    with open(path) as file:
+        state = json.load(file)
+    return controllers[state["type"]].from_dict(state)
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(42)
+
+    # Online FDR control
+    print("\nOnline FDR control:\nDecide on each p-value as soon as it arrives")
+
+    # Stream of 100000 p-values, 10% of them from true effects
+    m = 100000
+    is_effect = np.random.random(m) < 0.1
+    p_values = np.where(is_effect, np.random.beta(0.05, 1, size = m), np.random.random(m))
+
+    import os, tempfile
+    checkpoint = os.path.join(tempfile.mkdtemp(), "online_fdr_checkpoint.json")
+    for controller in (LordController(alpha = 0.05), AlphaInvestingController(alpha = 0.05)):
+        # First half online, checkpoint, then resume and replay the second half
+        first = [controller.test(p) for p in p_values[:m // 2]]
+        controller.save(checkpoint)
+        resumed = load_controller(checkpoint)
+        second, _ = resumed.replay(p_values[m // 2:])
+        decisions = np.concatenate([first, second])
+
+        false_discoveries = np.count_nonzero(decisions & ~is_effect)
+        print(f"\n{type(controller).__name__}: discoveries = {decisions.sum()}, "
+              f"false discovery proportion = {false_discoveries / max(decisions.sum(), 1):.4f}")
@@ -0,0 +1,97 @@
+# RCDS Further hypothesis testing
+# Jesus Urtasun Elizari - ICL London 2024 / 2025
+# Chapter 3 - Bayesian statistics
+
+# Importing libraries
+import numpy as np
+from scipy.special import betaln
+from scipy.stats import beta
+
+# Gauss-Legendre nodes and weights on [0, 1]
+def _legendre_01(n_nodes):
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    return (nodes + 1) / 2, weights / 2
+
+# P(B > A) for independent Beta(a1, b1) and Beta(a2, b2), vectorized over experiments
+# quadrature: P(B > A) = integral of f_B(x) F_A(x), with Gauss-Legendre nodes placed on the mean +- 12 standard
+# deviations (clipped to [0, 1]) of the narrower posterior; when A is the narrower one the nodes go on A and
+# P(B > A) = 1 - integral of f_A(x) F_B(x). The accuracy still depends on n_nodes when the two posteriors have
+# very different widths and the wider one is skewed, so use method = "exact" for final numbers
+# exact: closed-form sum over i < a2 (Miller, 2015), needs integer a2, cost grows with max(a2)
+def prob_b_beats_a(a1, b1, a2, b2, method = "quadrature", n_nodes = 96):
+    a1, b1, a2, b2 = np.broadcast_arrays(*[np.asarray(v, dtype = float) for v in (a1, b1, a2, b2)])
+    if method == "quadrature":
+        u, w = _legendre_01(n_nodes)
+        mean_a, mean_b = a1 / (a1 + b1), a2 / (a2 + b2)
+        var_a = mean_a * (1 - mean_a) / (a1 + b1 + 1)
+        var_b = mean_b * (1 - mean_b) / (a2 + b2 + 1)
+        swap = var_a < var_b
+        # (a_in, b_in): posterior carrying the nodes, (a_out, b_out): posterior entering through its cdf
+        a_in, b_in, a_out, b_out = np.where(swap, a1, a2), np.where(swap, b1, b2), np.where(swap, a2, a1), np.where(swap, b2, b1)
+        mean, sd = np.where(swap, mean_a, mean_b), np.sqrt(np.minimum(var_a, var_b))
+        low, high = np.maximum(mean - 12 * sd, 0.0), np.minimum(mean + 12 * sd, 1.0)
+        x = low[..., None] + (high - low)[..., None] * u
+        integrand = beta.pdf(x, a_in[..., None], b_in[..., None]) * beta.cdf(x, a_out[..., None], b_out[..., None])
+        integral = np.clip((high - low) * (integrand @ w), 0, 1)
+        return np.where(swap, 1 - integral, integral)
+    if method == "exact":
+        if np.any(a2 != np.round(a2)):
+            raise ValueError("the exact formula needs integer a2")
+        i = np.arange(int(a2.max()))
+        terms = np.exp(betaln(a1[..., None] + i, b1[..., None] + b2[..., None]) - np.log(b2[..., None] + i)
+                       - betaln(1 + i, b2[..., None]) - betaln(a1, b1)[..., None])
+        return np.clip(np.sum(np.where(i < a2[..., None], terms, 0.0), axis = -1), 0, 1)
+    raise ValueError("method must be 'quadrature' or 'exact'")
+
+# Expected loss of choosing B (or A) in conversion-rate units, from the same P(B > A) formula
+# E[max(A - B, 0)] = E[A] P(A+ > B) - E[B] P(A > B+), where A+ ~ Beta(a1 + 1, b1) and B+ ~ Beta(a2 + 1, b2)
+def expected_loss(a1, b1, a2, b2, **kwargs):
+    mean_a, mean_b = a1 / (a1 + b1), a2 / (a2 + b2)
+    p_a_plus = prob_b_beats_a(a1 + 1, b1, a2, b2, **kwargs)
+    p_b_plus = prob_b_beats_a(a1, b1, a2 + 1, b2, **kwargs)
+    loss_b = mean_a * (1 - p_a_plus) - mean_b * (1 - p_b_plus)
+    loss_a = mean_b * p_b_plus - mean_a * p_a_plus
+    return np.maximum(loss_a, 0.0), np.maximum(loss_b, 0.0)
+
+# Bayesian A/B summary for many experiments: posteriors Beta(prior_a + successes, prior_b + failures)
+def bayesian_ab_test(successes_a, trials_a, successes_b, trials_b, prior = (1.0, 1.0), level = 0.95, **kwargs):
+    successes_a, trials_a, successes_b, trials_b = [np.asarray(v, dtype = float) for v in (successes_a, trials_a, successes_b, trials_b)]
+    a1, b1 = prior[0] + successes_a, prior[1] + trials_a - successes_a
+    a2, b2 = prior[0] + successes_b, prior[1] + trials_b - successes_b
+    tail = (1 - level) / 2
+    loss_a, loss_b = expected_loss(a1, b1, a2, b2, **kwargs)
+    return {
+        "prob_b_beats_a": prob_b_beats_a(a1, b1, a2, b2, **kwargs),
+        "expected_loss_a": loss_a,
+        "expected_loss_b": loss_b,
+        "interval_a": (beta.ppf(tail, a1, b1), beta.ppf(1 - tail, a1, b1)),
+        "interval_b": (beta.ppf(tail, a2, b2), beta.ppf(1 - tail, a2, b2)),
+    }
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Bayesian A/B test ..............................................................................
+    print("Bayesian A/B test:\n")
+
+    # One experiment: variant A converts 120 / 1000 visitors, variant B 145 / 1000
+    result = bayesian_ab_test(120, 1000, 145, 1000)
+    print(f"P(B > A) = {result['prob_b_beats_a']:.4f}")
+    print(f"Expected loss choosing A = {result['expected_loss_a']:.5f}, choosing B = {result['expected_loss_b']:.5f}")
+    print(f"95% credible interval A = ({result['interval_a'][0]:.4f}, {result['interval_a'][1]:.4f})")
+    print(f"95% credible interval B = ({result['interval_b'][0]:.4f}, {result['interval_b'][1]:.4f})")
+
+    # Compare with the exact formula and with sampling
+    exact = prob_b_beats_a(121, 881, 146, 856, method = "exact")
+    draws_a, draws_b = np.random.beta(121, 881, 10 ** 6), np.random.beta(146, 856, 10 ** 6)
+    print(f"\nP(B > A): exact = {exact:.4f}, sampling (10^6 draws) = {np.mean(draws_b > draws_a):.4f}")
+
+    # 5000 experiments in one call
+    trials = np.random.randint(100, 100000, size = 5000)
+    successes_a = np.random.binomial(trials, 0.1)
+    successes_b = np.random.binomial(trials, 0.102)
+    result = bayesian_ab_test(successes_a, trials, successes_b, trials)
+    print(f"\nExperiments where P(B > A) > 0.95: {np.sum(result['prob_b_beats_a'] > 0.95)} of {trials.size}")
@@ -0,0 +1,96 @@
+# RCDS Further hypothesis testing
+# Jesus Urtasun Elizari - ICL London 2024 / 2025
+# Chapter 3 - Bayesian statistics
+
+# Importing libraries
+import numpy as np
+from scipy.special import logsumexp
+
+# Log-likelihood table log P(outcome k | hypothesis h), shape (H, K), from a table of probabilities
+def log_likelihood_table(probabilities):
+    with np.errstate(divide = "ignore"):
+        return np.log(np.asarray(probabilities, dtype = float))
+
+# Normalise log weights over the hypotheses (last axis), so that they exponentiate to probabilities
+def normalise_log(log_weights):
+    return log_weights - logsumexp(log_weights, axis = -1, keepdims = True)
+
+# Whole posterior trajectory for a sequence of categorical observations in one vectorized call
+# observations are outcome codes 0 .. K - 1, row t of the result is log P(H | first t observations)
+# Working in log space avoids the underflow of multiplying many small likelihoods
+def log_posterior_trajectory(observations, log_likelihoods, log_prior):
+    observations = np.asarray(observations, dtype = np.int64)
+    steps = log_likelihoods.T[observations]
+    cumulative = np.vstack([log_prior, log_prior + np.cumsum(steps, axis = 0)])
+    return normalise_log(cumulative)
+
+# Posterior over H hypotheses updated with chunks of an unbounded stream of observations
+# Only the current log posterior is kept, trajectories are returned per chunk on request
+class SequentialBayesUpdater:
+
+    def __init__(self, likelihoods, prior = None):
+        self.log_likelihoods = log_likelihood_table(likelihoods)
+        n_hypotheses = self.log_likelihoods.shape[0]
+        prior = np.full(n_hypotheses, 1 / n_hypotheses) if prior is None else np.asarray(prior, dtype = float)
+        self.log_posterior = normalise_log(log_likelihood_table(prior))
+        self.n_observations = 0
+
+    # Add a chunk of observations (outcome codes)
+    # Without a trajectory the update only needs the outcome counts: log prior + counts @ log likelihoods
+    def update(self, chunk, return_trajectory = False):
+        chunk = np.asarray(chunk, dtype = np.int64).ravel()
+        self.n_observations += chunk.size
+        if return_trajectory:
+            trajectory = log_posterior_trajectory(chunk, self.log_likelihoods, self.log_posterior)[1:]
+            self.log_posterior = trajectory[-1] if chunk.size else self.log_posterior
+            return trajectory
+        counts = np.bincount(chunk, minlength = self.log_likelihoods.shape[1])
+        # Outcomes that never occurred contribute nothing, even where the likelihood is zero
+        present = counts > 0
+        self.log_posterior = normalise_log(self.log_posterior + self.log_likelihoods[:, present] @ counts[present])
+        return self.log_posterior
+
+    @property
+    def posterior(self):
+        return np.exp(self.log_posterior)
+
+    # Small state, to checkpoint a long-running stream
+    def to_dict(self):
+        return {"log_likelihoods": self.log_likelihoods.tolist(), "log_posterior": self.log_posterior.tolist(),
+                "n_observations": self.n_observations}
+
+    @classmethod
+    def from_dict(cls, state):
+        updater = cls.__new__(cls)
+        updater.log_likelihoods = np.asarray(state["log_likelihoods"], dtype = float)
+        updater.log_posterior = np.asarray(state["log_posterior"], dtype = float)
+        updater.n_observations = state["n_observations"]
+        return updater
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Simulate multiple dice rolls ..................................................................
+    print("Simulate multiple dice rolls:\n")
+
+    # Hypotheses as in bayesian_simulation.py: H1 biased die, H2 fair die
+    # Outcomes: 0 = "not 6", 1 = "6"
+    biased_die_prob, fair_die_prob = 0.5, 1/6
+    likelihoods = [[1 - biased_die_prob, biased_die_prob], [1 - fair_die_prob, fair_die_prob]]
+    six_counts = np.random.binomial(1, biased_die_prob, 50)
+
+    # Whole trajectory in one call
+    trajectory = np.exp(log_posterior_trajectory(six_counts, log_likelihood_table(likelihoods), np.log([0.5, 0.5])))
+    print(f"Probability that the die is biased after 1, 10 and 50 rolls: {trajectory[[1, 10, 50], 0].round(4)}")
+
+    # Long stream with 1000 competing hypotheses on the probability of a 6
+    print("\nStream of 10 million rolls, 1000 hypotheses for P(6):")
+    grid = np.linspace(0.001, 0.999, 1000)
+    updater = SequentialBayesUpdater(np.column_stack([1 - grid, grid]))
+    for chunk in range(10):
+        updater.update(np.random.binomial(1, 0.2, 10 ** 6))
+    print(f"Most probable P(6) = {grid[np.argmax(updater.log_posterior)]:.3f}, "
+          f"posterior mass = {updater.posterior.max():.4f}, after {updater.n_observations} rolls")
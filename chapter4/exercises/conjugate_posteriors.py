@@ -0,0 +1,78 @@
+# RCDS Further hypothesis testing
+# Jesus Urtasun Elizari - ICL London 2024 / 2025
+# Chapter 3 - Bayesian statistics
+
+# Importing libraries
+import numpy as np
+from scipy.special import gammaln
+from scipy.stats import beta
+
+# Dirichlet-Multinomial posteriors for many segments at once
+# counts has shape (segments, categories), prior is a scalar, a (categories, ) vector or a full matrix
+# Beta-Binomial is the two-category case (columns: failures, successes)
+class DirichletPosterior:
+
+    def __init__(self, counts, prior = 1.0):
+        counts = np.atleast_2d(np.asarray(counts, dtype = float))
+        self.prior = np.broadcast_to(np.asarray(prior, dtype = float), counts.shape).copy()
+        self.alpha = self.prior + counts
+
+    # Incremental update with a new batch of counts, for all segments or only the given rows
+    # The posterior only depends on the running totals, so nothing is recomputed
+    def update(self, counts, rows = None):
+        counts = np.asarray(counts, dtype = float)
+        if rows is None:
+            self.alpha += counts
+        else:
+            # Repeated rows are accumulated, not overwritten
+            np.add.at(self.alpha, np.asarray(rows), counts)
+        return self
+
+    # Posterior mean, which is also the posterior predictive probability of the next observation
+    def mean(self):
+        return self.alpha / self.alpha.sum(axis = 1, keepdims = True)
+
+    # Equal-tailed marginal credible intervals: each category is Beta(alpha_k, alpha_0 - alpha_k)
+    def credible_interval(self, level = 0.95):
+        tail = (1 - level) / 2
+        rest = self.alpha.sum(axis = 1, keepdims = True) - self.alpha
+        return beta.ppf(tail, self.alpha, rest), beta.ppf(1 - tail, self.alpha, rest)
+
+    # Log posterior predictive probability of future count vectors, shape (segments, categories) or (1, categories)
+    def log_predictive(self, future_counts):
+        x = np.asarray(future_counts, dtype = float)
+        n, alpha_0 = x.sum(axis = 1), self.alpha.sum(axis = 1)
+        return (gammaln(n + 1) + gammaln(alpha_0) - gammaln(n + alpha_0)
+                + np.sum(gammaln(x + self.alpha) - gammaln(self.alpha) - gammaln(x + 1), axis = 1))
+
+# Beta-Binomial posteriors from successes out of trials, with a Beta(a, b) prior
+def beta_binomial_posterior(successes, trials, a = 1.0, b = 1.0):
+    successes = np.asarray(successes, dtype = float)
+    counts = np.column_stack([np.asarray(trials, dtype = float) - successes, successes])
+    return DirichletPosterior(counts, prior = [b, a])
+
+
+if __name__ == "__main__":
+
+    # Survey of the final assignment: how often each number 1-9 was chosen
+    observed_data = [40, 30, 10, 5, 5, 3, 2, 3, 2]
+    posterior = DirichletPosterior([observed_data], prior = 1.0)
+    low, high = posterior.credible_interval()
+    print("\nPosterior mean of each number 1-9:", posterior.mean()[0].round(3))
+    print("95% credible intervals:")
+    for number, (l, h) in enumerate(zip(low[0], high[0]), start = 1):
+        print(f"{number}: ({l:.3f}, {h:.3f})")
+
+    # 200000 segments, updated with a new survey batch for some of them
+    np.random.seed(123)
+    segments = np.random.multinomial(100, np.array(observed_data) / 100, size = 200000)
+    posterior = DirichletPosterior(segments, prior = 1.0)
+    rows = np.random.randint(0, 200000, size = 5000)
+    posterior.update(np.random.multinomial(20, np.full(9, 1 / 9), size = 5000), rows = rows)
+    print(f"\nPosterior mean of number 1 in the first segment: {posterior.mean()[0, 0]:.3f}")
+    new_response = np.eye(9)[:1]  # One respondent choosing number 1, broadcast over all segments
+    print(f"Predictive probability of a new '1' (first 3 segments): {np.exp(posterior.log_predictive(new_response))[:3].round(3)}")
+
+    # Beta-Binomial: conversion rates of 3 variants
+    rates = beta_binomial_posterior([12, 30, 45], [100, 200, 300])
+    print("\nConversion rate posterior means:", rates.mean()[:, 1].round(3))
@@ -0,0 +1,115 @@
+# RCDS Further hypothesis testing
+# Jesus Urtasun Elizari - ICL London 2024 / 2025
+# Chapter 3 - Bayesian statistics
+
+# Importing libraries
+import numpy as np
+
+# Running convergence diagnostics of C chains, updated one draw (for all chains) at a time
+# R-hat from running per-chain means and variances (Welford), ESS from batch means of fixed batch size
+class ChainDiagnostics:
+
+    def __init__(self, n_chains, n_dims, batch_size):
+        self.n = 0
+        self.mean = np.zeros((n_chains, n_dims))
+        self.m2 = np.zeros((n_chains, n_dims))
+        self.batch_size = batch_size
+        self.batch_sum = np.zeros((n_chains, n_dims))
+        self.n_batches = 0
+        self.batch_mean = np.zeros((n_chains, n_dims))
+        self.batch_m2 = np.zeros((n_chains, n_dims))
+
+    def update(self, draws):
+        self.n += 1
+        delta = draws - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (draws - self.mean)
+        self.batch_sum += draws
+        if self.n % self.batch_size == 0:
+            means = self.batch_sum / self.batch_size
+            self.batch_sum[:] = 0.0
+            self.n_batches += 1
+            delta = means - self.batch_mean
+            self.batch_mean += delta / self.n_batches
+            self.batch_m2 += delta * (means - self.batch_mean)
+
+    # Potential scale reduction factor per dimension (Gelman & Rubin)
+    def r_hat(self):
+        n = self.n
+        within = np.mean(self.m2 / (n - 1), axis = 0)
+        between = n * np.var(self.mean, axis = 0, ddof = 1)
+        return np.sqrt(((n - 1) / n * within + between / n) / within)
+
+    # Effective sample size per dimension, all chains together (batch means estimator)
+    def ess(self):
+        if self.n_batches < 2:
+            return np.full(self.mean.shape[1], np.nan)
+        variance = np.mean(self.m2 / (self.n - 1), axis = 0)
+        batch_variance = np.mean(self.batch_m2 / (self.n_batches - 1), axis = 0)
+        return self.mean.shape[0] * self.n * variance / (self.batch_size * batch_variance)
+
+# Random-walk Metropolis advancing C chains in lockstep, every step is one array operation over all chains
+# log_density maps a (C, d) array of positions to (C, ) log densities (up to a constant)
+# Step sizes are adapted per chain during warmup towards the target acceptance rate, then frozen
+# Draws are written into out (an (n_draws, C, d) array, np.memmap, or a file path for a new memmap)
+def metropolis(log_density, initial, n_draws = 5000, n_warmup = 1000, step_size = 1.0, target_acceptance = None,
+               out = None, seed = None):
+    rng = np.random.default_rng(seed)
+    position = np.array(initial, dtype = float, ndmin = 2)
+    n_chains, n_dims = position.shape
+    if target_acceptance is None:
+        target_acceptance = 0.44 if n_dims == 1 else 0.234
+    log_step = np.full(n_chains, np.log(step_size))
+    current = log_density(position)
+
+    # Preallocated (or memory-mapped) output
+    if out is None:
+        out = np.empty((n_draws, n_chains, n_dims))
+    elif isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode = "w+", dtype = float, shape = (n_draws, n_chains, n_dims))
+    diagnostics = ChainDiagnostics(n_chains, n_dims, max(1, int(np.sqrt(n_draws))))
+    accepted = np.zeros(n_chains)
+
+    for step in range(n_warmup + n_draws):
+        proposal = position + np.exp(log_step)[:, None] * rng.standard_normal((n_chains, n_dims))
+        proposed = log_density(proposal)
+        log_ratio = proposed - current
+        accept = np.log(rng.random(n_chains)) < log_ratio
+        position[accept] = proposal[accept]
+        current[accept] = proposed[accept]
+
+        if step < n_warmup:
+            # Robbins-Monro adaptation of the log step size towards the target acceptance rate
+            acceptance = np.exp(np.minimum(log_ratio, 0.0))
+            log_step += (acceptance - target_acceptance) / (step + 1) ** 0.6
+        else:
+            out[step - n_warmup] = position
+            diagnostics.update(position)
+            accepted += accept
+
+    return out, {"r_hat": diagnostics.r_hat(), "ess": diagnostics.ess(),
+                 "acceptance": accepted / n_draws, "step_size": np.exp(log_step)}
+
+
+if __name__ == "__main__":
+
+    # Random seed
+    np.random.seed(123)
+
+    # Posterior of the probability of rolling a 6 ...................................................
+    print("Posterior of the probability of a 6 by Metropolis sampling:\n")
+
+    # 50 rolls of the biased die from bayesian_simulation.py, uniform prior on the probability
+    six_counts = np.random.binomial(1, 0.5, 50)
+    sixes, rolls = six_counts.sum(), six_counts.size
+
+    # Sample the log-odds, so the chains move on the whole real line
+    def log_posterior(logit):
+        theta = logit[:, 0]
+        return sixes * theta - rolls * np.logaddexp(0, theta) + theta - 2 * np.logaddexp(0, theta)
+
+    draws, diagnostics = metropolis(log_posterior, np.random.normal(size = (64, 1)), n_draws = 5000, seed = 1)
+    p_six = 1 / (1 + np.exp(-draws[..., 0]))
+    print(f"64 chains, 5000 draws each: R-hat = {diagnostics['r_hat'][0]:.4f}, ESS = {diagnostics['ess'][0]:.0f}")
+    print(f"Mean acceptance rate = {diagnostics['acceptance'].mean():.3f}")
+    print(f"Posterior mean of P(6): sampled = {p_six.mean():.4f}, exact Beta = {(sixes + 1) / (rolls + 2):.4f}")
@@ -0,0 +1,254 @@
+# RCDS Advanced probability and statistical inference.
+# Jesús Urtasun Elizari. ICL 2024 / 2025.
+# Command-line runner for the hypothesis tests of chapters 1-4.
+#
+# Usage examples:
+#   python hyptest.py ttest1 --input data.csv --column x --popmean 0.5
+#   python hyptest.py ttest2 --input data.csv --column value --group group
+#   python hyptest.py ftest --input data.csv --column value --group group
+#   python hyptest.py anova --input data.csv --column value --group group
+#   python hyptest.py chi2 --input data.csv --column choice
+#   python hyptest.py chi2 --input data.csv --column region --by product
+#   python hyptest.py adjust --input pvalues.csv --column p --method bh
+#   python hyptest.py bayes --prior 0.5 0.5 --likelihood 0.5 0.1667 --times 2
+#   python hyptest.py ab --successes 120 145 --trials 1000 1000
+#
+# Results are printed as JSON. Only the modules needed by the chosen subcommand are imported,
+# and matplotlib is imported only when --plot is given (the figure is saved, never shown).
+
+# Import libraries (standard library only, everything else is loaded on demand)
+import argparse
+import csv
+import importlib
+import json
+import math
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Import an exercise module by chapter directory and file name
+def load(directory, module):
+    path = os.path.join(here, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+# Read the named columns of a CSV file (or standard input for "-") as lists of strings
+def read_columns(path, names):
+    file = sys.stdin if path == "-" else open(path, newline = "")
+    try:
+        reader = csv.DictReader(file)
+        missing = [name for name in names if name not in (reader.fieldnames or [])]
+        if missing:
+            raise SystemExit(f"column(s) not found in {path}: {', '.join(missing)}")
+        columns = {name: [] for name in names}
+        for row in reader:
+            for name in names:
+                columns[name].append(row[name])
+        return columns
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+# Missing-value markers: empty cells, NA (R's write.csv), NaN and null
+def is_missing(value):
+    return value.strip().lower() in ("", "na", "nan", "null")
+
+# Numeric column, missing cells become NaN, any other text stops with an error naming the column
+def numeric(values, name):
+    import numpy as np
+    try:
+        return np.array([np.nan if is_missing(v) else float(v) for v in values])
+    except ValueError as error:
+        raise SystemExit(f"column {name} is not numeric: {error}")
+
+# Observations of a numeric column, rows with a missing or non-finite value are dropped
+def observations(values, name):
+    import numpy as np
+    values = numeric(values, name)
+    return values[np.isfinite(values)]
+
+# Integer codes of a categorical column, labels in sorted order (numeric order when every label is a number)
+def codes(values):
+    import numpy as np
+    labels, inverse = np.unique(np.asarray(values), return_inverse = True)
+    try:
+        order = np.argsort([float(label) for label in labels], kind = "stable")
+    except ValueError:
+        order = np.arange(labels.size)
+    position = np.empty(labels.size, dtype = np.int64)
+    position[order] = np.arange(labels.size)
+    return position[inverse.ravel()], labels[order].tolist()
+
+# Values split by group label, in sorted label order
+# Rows with a missing or non-finite value or a missing group label are dropped
+def split_groups(args):
+    import numpy as np
+    data = read_columns(args.input, [args.column, args.group])
+    values = numeric(data[args.column], args.column)
+    keep = np.isfinite(values) & np.array([not is_missing(label) for label in data[args.group]], dtype = bool)
+    values = values[keep]
+    labels, names = codes([label for label, kept in zip(data[args.group], keep) if kept])
+    return values, labels, names, [values[labels == g] for g in range(len(names))]
+
+# Save a histogram of one or more samples, only when --plot is requested
+def save_plot(path, samples, names, title):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.figure()
+    for sample, name in zip(samples, names):
+        plt.hist(sample[~(sample != sample)], bins = 15, alpha = 0.5, edgecolor = "black", label = str(name))
+    plt.title(title)
+    plt.xlabel("Value")
+    plt.ylabel("Frequency")
+    plt.legend()
+    plt.savefig(path, dpi = 300, bbox_inches = "tight")
+    plt.close()
+
+# Subcommands ........................................................................................
+
+def run_ttest1(args):
+    values = observations(read_columns(args.input, [args.column])[args.column], args.column)
+    t_stat, p_value, df = load("chapter1/exercises", "t_test_batched").ttest_1samp_batched(
+        values[None, :], popmean = args.popmean, alternative = args.alternative)
+    if args.plot:
+        save_plot(args.plot, [values], [args.column], "Histogram of observations")
+    return {"test": "one-sample t-test", "t_statistic": t_stat[0], "df": df[0], "p_value": p_value[0]}
+
+def run_ttest2(args):
+    values, labels, names, groups = split_groups(args)
+    if len(groups) != 2:
+        raise SystemExit("ttest2 needs exactly two groups")
+    accumulator = load("chapter1/exercises", "t_test_streaming").WelchTTestAccumulator()
+    accumulator.update(0, groups[0]).update(1, groups[1])
+    t_stat, df, p_value = accumulator.result(args.alternative)
+    if args.plot:
+        save_plot(args.plot, groups, names, "Histogram of observations")
+    return {"test": "Welch two-sample t-test", "groups": names, "t_statistic": t_stat, "df": df, "p_value": p_value}
+
+def run_ftest(args):
+    values, labels, names, groups = split_groups(args)
+    results = load("chapter2/exercises", "f_test_batched").variance_tests_batched(*groups)
+    return {"test": "equal variances", "groups": names,
+            **{name: {"statistic": stat[0], "p_value": p[0]} for name, (stat, p) in results.items()}}
+
+def run_anova(args):
+    values, labels, names, groups = split_groups(args)
+    F_stat, p_value, df_between, df_within = load("chapter2/exercises", "f_anova_grouped").anova_oneway_grouped(values, labels)
+    if args.plot:
+        save_plot(args.plot, groups, names, "Histogram of observations")
+    return {"test": "one-way ANOVA", "groups": names, "F_statistic": F_stat, "df_between": df_between,
+            "df_within": df_within, "p_value": p_value}
+
+def run_chi2(args):
+    contingency = load("chapter3/exercises", "contingency_chi2")
+    columns = [args.column] + ([args.by] if args.by else [])
+    data = read_columns(args.input, columns)
+    # Rows with a missing category in any of the columns are dropped
+    keep = [not any(is_missing(data[name][row]) for name in columns) for row in range(len(data[args.column]))]
+    data = {name: [value for value, kept in zip(data[name], keep) if kept] for name in columns}
+    row_codes, row_names = codes(data[args.column])
+    if args.by:
+        col_codes, col_names = codes(data[args.by])
+        table = contingency.contingency_table(row_codes, col_codes, shape = (len(row_names), len(col_names)))
+        stat, p_value, df = contingency.chi2_independence(table, args.statistic)
+        return {"test": f"{args.statistic} independence test", "statistic": stat, "df": df, "p_value": p_value}
+    counts = contingency.count_categories(row_codes, len(row_names))
+    if args.expected is not None and len(args.expected) != len(row_names):
+        raise SystemExit(f"--expected needs {len(row_names)} counts, one per category in the order {', '.join(row_names)}")
+    stat, p_value, df = contingency.chi2_goodness_of_fit(counts, args.expected)
+    return {"test": "chi-square goodness of fit", "categories": row_names, "observed": counts,
+            "statistic": stat, "df": df, "p_value": p_value}
+
+# Missing p-values keep their row (so the output lines up with the input) but are not adjusted or counted in m
+def run_adjust(args):
+    import numpy as np
+    p_values = numeric(read_columns(args.input, [args.column])[args.column], args.column)
+    adjusted = load("chapter3/exercises", "adjusted_pvalues_batched").adjust_pvalues(p_values, args.method)
+    return {"method": args.method, "tests": int(np.isfinite(p_values).sum()), "missing": int((~np.isfinite(p_values)).sum()),
+            "adjusted": adjusted, "rejected": int((adjusted < args.alpha).sum())}
+
+def run_bayes(args):
+    import numpy as np
+    bayes = load("chapter4/exercises", "bayesian_log_updater")
+    likelihood = np.asarray(args.likelihood, dtype = float)
+    if likelihood.size != len(args.prior):
+        raise SystemExit("give one likelihood per hypothesis")
+    # Evidence observed --times times: outcome 1 has the given likelihoods, outcome 0 the complement
+    updater = bayes.SequentialBayesUpdater(np.column_stack([1 - likelihood, likelihood]), args.prior)
+    trajectory = np.exp(updater.update(np.ones(args.times, dtype = np.int64), return_trajectory = True))
+    return {"prior": args.prior, "posterior": trajectory[-1], "trajectory": trajectory}
+
+def run_ab(args):
+    ab = load("chapter4/exercises", "bayesian_ab_test")
+    (s_a, s_b), (n_a, n_b) = args.successes, args.trials
+    return {"test": "Bayesian A/B", **ab.bayesian_ab_test(s_a, n_a, s_b, n_b, prior = tuple(args.prior), level = args.level)}
+
+# JSON output of numpy scalars and arrays, NaN and +-inf become null (plain JSON has no such numbers)
+def to_json(value):
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if hasattr(value, "tolist"):
+        return to_json(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+# Command-line interface .............................................................................
+
+def parser():
+    main = argparse.ArgumentParser(prog = "hyptest", description = "Run hypothesis tests on CSV data and print JSON results.")
+    commands = main.add_subparsers(dest = "command", required = True)
+
+    def data_command(name, help, run, group = False, plot = False, alternative = False):
+        command = commands.add_parser(name, help = help)
+        command.add_argument("--input", required = True, help = "CSV file with a header row ('-' for standard input)")
+        command.add_argument("--column", required = True, help = "column with the observations")
+        if group:
+            command.add_argument("--group", required = True, help = "column with the group labels")
+        if alternative:
+            command.add_argument("--alternative", choices = ["two-sided", "greater", "less"], default = "two-sided")
+        if plot:
+            command.add_argument("--plot", metavar = "PNG", help = "save a histogram to this file (imports matplotlib)")
+        command.set_defaults(run = run)
+        return command
+
+    data_command("ttest1", "one-sample t-test", run_ttest1, plot = True, alternative = True).add_argument(
+        "--popmean", type = float, default = 0.0, help = "mean under H0")
+    data_command("ttest2", "Welch two-sample t-test", run_ttest2, group = True, plot = True, alternative = True)
+    data_command("ftest", "F, Bartlett, Levene and Brown-Forsythe tests", run_ftest, group = True)
+    data_command("anova", "one-way ANOVA", run_anova, group = True, plot = True)
+    chi2 = data_command("chi2", "chi-square goodness of fit, or independence with --by", run_chi2)
+    chi2.add_argument("--by", help = "second categorical column, for a test of independence")
+    chi2.add_argument("--expected", type = float, nargs = "+", help = "expected counts, one per category in sorted label order (numeric order for numeric labels, default: uniform)")
+    chi2.add_argument("--statistic", choices = ["pearson", "g"], default = "pearson")
+    adjust = data_command("adjust", "adjusted p-values", run_adjust)
+    adjust.add_argument("--method", choices = ["bonferroni", "holm", "hochberg", "bh", "by", "storey"], default = "bh")
+    adjust.add_argument("--alpha", type = float, default = 0.05)
+
+    bayes = commands.add_parser("bayes", help = "posterior of discrete hypotheses after repeated evidence")
+    bayes.add_argument("--prior", type = float, nargs = "+", required = True)
+    bayes.add_argument("--likelihood", type = float, nargs = "+", required = True, help = "P(evidence | H) for each hypothesis")
+    bayes.add_argument("--times", type = int, default = 1, help = "number of times the evidence is observed")
+    bayes.set_defaults(run = run_bayes)
+
+    ab = commands.add_parser("ab", help = "Bayesian A/B test of two conversion rates")
+    ab.add_argument("--successes", type = float, nargs = 2, required = True)
+    ab.add_argument("--trials", type = float, nargs = 2, required = True)
+    ab.add_argument("--prior", type = float, nargs = 2, default = [1.0, 1.0])
+    ab.add_argument("--level", type = float, default = 0.95)
+    ab.set_defaults(run = run_ab)
+    return main
+
+def main(argv = None):
+    args = parser().parse_args(argv)
+    json.dump(to_json(args.run(args)), sys.stdout, indent = 2, allow_nan = False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()